@@ -6,7 +6,7 @@ import glob
 from lxml import etree
 
 
-_count_directory_mappings = etree.XPath('count(./mapping[@directory=$directory])')
+_module_prefix = '$PROJECT_DIR$/vendor/acsi/'
 
 
 def path_normalize(root, *paths):
@@ -46,16 +46,47 @@ def walk_module_dirs(project_dir):
         yield make_module_path_relative(project_dir, git_dir)
 
 
-def append_mapping(parent, relative_dir, vcs_type='Git'):
+def mapped_directories(parent):
+    return set(mapping.get('directory') for mapping in parent.iterfind('mapping'))
+
+
+def append_mapping(parent, relative_dir, vcs_type='Git', existing=None):
     attributes = {
         'directory': '$PROJECT_DIR$/%s' % relative_dir,
         'vcs': vcs_type
     }
-    if _count_directory_mappings(parent, directory=attributes['directory']) == 0.0:
+    if existing is None:
+        existing = mapped_directories(parent)
+    if attributes['directory'] not in existing:
         etree.SubElement(parent, 'mapping', attrib=attributes)
+        existing.add(attributes['directory'])
+        return True
+    return False
+
+
+def merge_mappings(parent, module_paths, vcs_type='Git', prune=True):
+    """Add mappings for missing ``module_paths`` in sorted order and, with ``prune``, drop
+    mappings of acsi modules that no longer exist. Returns the added and removed directories.
+    """
+    wanted = set('$PROJECT_DIR$/%s' % module_path for module_path in module_paths)
+    removed = []
+    if prune:
+        for mapping in list(parent.iterfind('mapping')):
+            directory = mapping.get('directory') or ''
+            if directory.startswith(_module_prefix) and directory not in wanted:
+                parent.remove(mapping)
+                removed.append(directory)
+
+    existing = mapped_directories(parent)
+    added = []
+    for module_path in sorted(module_paths):
+        if append_mapping(parent, module_path, vcs_type=vcs_type, existing=existing):
+            added.append('$PROJECT_DIR$/%s' % module_path)
+
+    return added, removed
 
 
-def main(project_dir, print_xml=False):
+def main(project_dir, print_xml=False, prune=True):
 
     xml_path = get_xml_path(project_dir)
 
@@ -67,14 +98,13 @@ def main(project_dir, print_xml=False):
     if not len(component):
         sys.exit(2)
 
-    for module_path in walk_module_dirs(project_dir):
-        append_mapping(component, module_path)
+    added, removed = merge_mappings(component, list(walk_module_dirs(project_dir)), prune=prune)
 
     encoding = vcs_xml.docinfo.encoding
 
     if print_xml:
         print(etree.tostring(vcs_xml, pretty_print=True, xml_declaration=True, encoding=encoding))
-    else:
+    elif added or removed:
         vcs_xml.write(xml_path, pretty_print=True, xml_declaration=True, encoding=encoding)
 
 
@@ -83,5 +113,6 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Add acsi modules VCS roots to PhpStorm project")
     parser.add_argument('project_root', help="Root of the PhpStorm project")
     parser.add_argument('-p', '--print', help="Print the modified vcs.xml instead of writing it", action="store_true", dest='print_xml')
+    parser.add_argument('-k', '--keep-missing', help="Keep mappings of acsi modules that no longer exist", action="store_false", dest='prune')
     args = parser.parse_args()
-    main(args.project_root, print_xml=args.print_xml)
+    main(args.project_root, print_xml=args.print_xml, prune=args.prune)
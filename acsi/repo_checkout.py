@@ -1,10 +1,24 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import glob
+import json
 import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
 import pygit2
 from termcolor import cprint
 
+SKIPPED = 'skipped'
+FAILED = 'failed'
+SWITCHED = 'switched'
+
+_colors = {SKIPPED: 'cyan', FAILED: 'red', SWITCHED: 'green'}
+
+DEFAULT_STATE_PATH = '~/.cache/acsi/repo_checkout.json'
+
 
 def path_normalize(root, *paths):
     path = os.path.join(root, *paths)
@@ -18,26 +32,162 @@ def walk_module_dirs(project_dir):
         yield git_dir
 
 
-def checkout_branch(git_dir, branch_name, base_dir):
+def read_head(git_dir):
+    """Branch name HEAD points to, read from the HEAD file without opening the repo; None when detached."""
+    try:
+        with open(os.path.join(git_dir, 'HEAD'), mode='r') as head_file:
+            head = head_file.read().strip()
+    except (IOError, OSError):
+        return None
+    if head.startswith('ref: refs/heads/'):
+        return head[len('ref: refs/heads/'):]
+    return None
+
+
+def index_stat(git_dir):
+    try:
+        stat = os.stat(os.path.join(git_dir, 'index'))
+    except (IOError, OSError):
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class RepoStateCache(object):
+    """HEAD, index mtime/size and last dirty result per repo, kept in a JSON file between runs."""
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path_normalize(path)
+        self.states = self._load()
+        self.changed = False
+
+    def _load(self):
+        try:
+            with open(self.path, mode='r') as state_file:
+                return json.load(state_file)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def get(self, git_dir):
+        return self.states.get(git_dir)
+
+    def set(self, git_dir, state):
+        if self.states.get(git_dir) != state:
+            self.states[git_dir] = state
+            self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        handle, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(handle, 'w') as tmp_file:
+            json.dump(self.states, tmp_file, indent=2, sort_keys=True)
+        os.rename(tmp_path, self.path)
+        self.changed = False
+
+
+def is_unchanged(state, git_dir, branch_name):
+    """True when the cached ``state`` shows ``branch_name`` checked out and neither HEAD nor the index moved since."""
+    if not state or state.get('head') != branch_name:
+        return False
+    return read_head(git_dir) == branch_name and index_stat(git_dir) == state.get('index')
+
+
+def is_known_dirty(state, git_dir):
+    """True when the last scan found uncommitted work and neither HEAD nor the index moved since.
+
+    Only a dirty result is reused: unstaged edits leave the index untouched,
+    so a cached clean result could hide new work, while staging, committing
+    or discarding changes rewrites the index and invalidates a dirty one.
+    """
+    if not state or not state.get('dirty') or state.get('head') is None:
+        return False
+    return read_head(git_dir) == state['head'] and index_stat(git_dir) == state.get('index')
+
+
+def _checkout(git_dir, branch_name, rel_dir):
     repo = pygit2.Repository(git_dir)
-    rel_dir = os.path.relpath(git_dir, base_dir)
     if repo.head.shorthand == branch_name:
-        cprint('skipping: `%s` branch is already checked out for repo (%s)' % (branch_name, rel_dir), 'cyan')
-        return
+        return SKIPPED, 'skipping: `%s` branch is already checked out for repo (%s)' % (branch_name, rel_dir), None
     branch_ref = repo.lookup_branch(branch_name)
     if not branch_ref:
-        cprint('error: `%s` branch not found in repo (%s)' % (branch_name, rel_dir), 'red')
-        return
+        return FAILED, 'error: `%s` branch not found in repo (%s)' % (branch_name, rel_dir), None
     if bool(repo.status()):
-        cprint('error: the current branch (%s) has uncommited work in repo (%s)' % (repo.head.shorthand, rel_dir), 'red')
-        return
+        message = 'error: the current branch (%s) has uncommited work in repo (%s)' % (repo.head.shorthand, rel_dir)
+        return FAILED, message, True
     repo.checkout(branch_ref)
-    cprint('success: `%s` branch not checked out for repo (%s)' % (branch_name, rel_dir), 'green')
+    return SWITCHED, 'success: `%s` branch not checked out for repo (%s)' % (branch_name, rel_dir), False
+
+
+def checkout_branch(git_dir, branch_name, base_dir, state=None):
+    """Check out ``branch_name`` in one repo; returns its status, message, timing and new cache state.
+
+    Given the cached ``state`` of the repo, a repo still on ``branch_name``
+    with an untouched index is skipped without opening it, and a repo found
+    dirty last time with the same HEAD and index fails without a worktree scan.
+    """
+    started = time.time()
+    rel_dir = os.path.relpath(git_dir, base_dir)
+    if is_unchanged(state, git_dir, branch_name):
+        message = 'skipping: `%s` branch is already checked out for repo (%s) (cached)' % (branch_name, rel_dir)
+        return {'git_dir': git_dir, 'repo': rel_dir, 'status': SKIPPED, 'message': message,
+                'elapsed': time.time() - started, 'state': state}
+
+    if is_known_dirty(state, git_dir):
+        message = 'error: the current branch (%s) has uncommited work in repo (%s) (cached, use --force-rescan to recheck)' % (
+            state['head'], rel_dir)
+        return {'git_dir': git_dir, 'repo': rel_dir, 'status': FAILED, 'message': message,
+                'elapsed': time.time() - started, 'state': state}
+
+    dirty = None
+    try:
+        status, message, dirty = _checkout(git_dir, branch_name, rel_dir)
+    except pygit2.GitError as error:
+        status, message = FAILED, 'error: %s in repo (%s)' % (error, rel_dir)
+
+    new_state = {'head': read_head(git_dir), 'index': index_stat(git_dir), 'dirty': dirty}
+    return {'git_dir': git_dir, 'repo': rel_dir, 'status': status, 'message': message,
+            'elapsed': time.time() - started, 'state': new_state}
+
+
+def print_result(result):
+    cprint(result['message'], _colors[result['status']])
+
+
+def print_summary(results, elapsed):
+    for status in (SWITCHED, SKIPPED, FAILED):
+        matching = [result for result in results if result['status'] == status]
+        cprint('%s: %d' % (status, len(matching)), _colors[status])
+        for result in matching:
+            print('  %-50s %7.2fs' % (result['repo'], result['elapsed']))
+    print('%d repos in %.2fs' % (len(results), elapsed))
+
+
+def main(project_dir, branch, jobs=1, state_path=DEFAULT_STATE_PATH, rescan=False):
+    started = time.time()
+    git_dirs = sorted(walk_module_dirs(project_dir=project_dir))
+    cache = RepoStateCache(state_path)
+    states = [None if rescan else cache.get(git_dir) for git_dir in git_dirs]
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(checkout_branch, git_dirs, repeat(branch), repeat(project_dir), states))
+        for result in results:
+            print_result(result)
+    else:
+        results = []
+        for git_dir, state in zip(git_dirs, states):
+            result = checkout_branch(git_dir=git_dir, branch_name=branch, base_dir=project_dir, state=state)
+            print_result(result)
+            results.append(result)
 
+    for result in results:
+        cache.set(result['git_dir'], result['state'])
+    cache.save()
 
-def main(project_dir, branch):
-    for git_dir in walk_module_dirs(project_dir=project_dir):
-        checkout_branch(git_dir=git_dir, branch_name=branch, base_dir=project_dir)
+    print_summary(results, time.time() - started)
 
 
 if __name__ == '__main__':
@@ -45,5 +195,11 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Checkout branch for all acsi modules")
     parser.add_argument('project_root', help="Root of the PhpStorm project")
     parser.add_argument('-b', '--branch', help="branch to checkout (default: master)", default='master')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="number of repos to check in parallel processes (default: 1)")
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH,
+                        help="repo state cache file (default: %s)" % DEFAULT_STATE_PATH)
+    parser.add_argument('-f', '--force-rescan', action='store_true',
+                        help="ignore the state cache and check every repo")
     args = parser.parse_args()
-    main(args.project_root, args.branch)
\ No newline at end of file
+    main(args.project_root, args.branch, jobs=args.jobs, state_path=args.state, rescan=args.force_rescan)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""asyncio front-end for the ``solr.api`` endpoint classes.
+
+Each ``Async*`` class mirrors the method and property surface of its blocking
+counterpart: methods become coroutine functions and properties become awaitables::
+
+    limiter = Limiter(concurrency=16)
+    admins = [AsyncSchemaAdmin(base_uri, core, limiter=limiter) for core in cores]
+    schemas = await asyncio.gather(*[admin.schema for admin in admins])
+
+The blocking calls run on the limiter's worker threads, so at most
+``concurrency`` requests are in flight at any time, all sharing the keep-alive
+sessions of ``solr.session``. Property setters are reached through ``await obj.set(name, value)``.
+Generator methods such as ``FileAdmin.walk`` are run to completion on the
+limiter and their items returned as a list, so iterating never blocks the loop.
+"""
+
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from . import api
+
+
+class Limiter(object):
+    """Bounded worker pool the async endpoints hand their blocking calls to."""
+
+    def __init__(self, concurrency=8):
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='solr-aio')
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+default_limiter = Limiter()
+
+_async_classes = {}
+
+
+def _wrap(value, limiter):
+    async_class = _async_classes.get(type(value))
+    if async_class is None:
+        return value
+    return async_class.wrap(value, limiter=limiter)
+
+
+class _AsyncEndpoint(object):
+    _sync_class = None
+
+    def __init__(self, *args, **kwargs):
+        limiter = kwargs.pop('limiter', None)
+        self._limiter = limiter or default_limiter
+        self._sync = self._create(*args, **kwargs)
+
+    @classmethod
+    def _create(cls, *args, **kwargs):
+        return cls._sync_class(*args, **kwargs)
+
+    @classmethod
+    def wrap(cls, sync, limiter=None):
+        """Expose an existing blocking endpoint object through the async surface."""
+        instance = cls.__new__(cls)
+        instance._limiter = limiter or default_limiter
+        instance._sync = sync
+        return instance
+
+    @property
+    def sync(self):
+        return self._sync
+
+    async def _call(self, name, *args, **kwargs):
+        result = await self._limiter.run(getattr(self._sync, name), *args, **kwargs)
+        return _wrap(result, self._limiter)
+
+    async def _collect(self, name, *args, **kwargs):
+        fn = getattr(self._sync, name)
+        items = await self._limiter.run(lambda: list(fn(*args, **kwargs)))
+        return [_wrap(item, self._limiter) for item in items]
+
+    async def _get(self, name):
+        result = await self._limiter.run(getattr, self._sync, name)
+        return _wrap(result, self._limiter)
+
+    async def set(self, name, value):
+        await self._limiter.run(setattr, self._sync, name, value)
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('_sync', '_limiter'):
+            raise AttributeError(name)
+
+        attr = inspect.getattr_static(type(self._sync), name, None)
+
+        if inspect.isgeneratorfunction(attr):
+            return functools.partial(self._collect, name)
+
+        if inspect.isfunction(attr):
+            return functools.partial(self._call, name)
+
+        if hasattr(attr, '__get__') and not isinstance(attr, (staticmethod, classmethod)):
+            return self._get(name)
+
+        return _wrap(getattr(self._sync, name), self._limiter)
+
+    def __str__(self):
+        return str(self._sync)
+
+
+def _register(async_class):
+    _async_classes[async_class._sync_class] = async_class
+    return async_class
+
+
+@_register
+class AsyncSystemAPI(_AsyncEndpoint):
+    _sync_class = api.SystemAPI
+
+    @classmethod
+    def _create(cls, base_uri):
+        return api.get_system(base_uri)
+
+
+@_register
+class AsyncCore(_AsyncEndpoint):
+    _sync_class = api.Core
+
+
+@_register
+class AsyncConfigAPI(_AsyncEndpoint):
+    _sync_class = api.ConfigAPI
+
+
+@_register
+class AsyncSchemaAdmin(_AsyncEndpoint):
+    _sync_class = api.SchemaAdmin
+
+
+@_register
+class AsyncManagedResources(_AsyncEndpoint):
+    _sync_class = api.ManagedResources
+
+
+@_register
+class AsyncFileAdmin(_AsyncEndpoint):
+    _sync_class = api.FileAdmin
+
+
+@_register
+class AsyncUpdateAPI(_AsyncEndpoint):
+    _sync_class = api.UpdateAPI
+
+
+async def gather_limited(*awaitables, **kwargs):
+    """``asyncio.gather`` with an upper bound on how many awaitables run at once."""
+    limit = kwargs.pop('limit', None)
+    if not limit:
+        return await asyncio.gather(*awaitables, **kwargs)
+
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*[bounded(a) for a in awaitables], **kwargs)
@@ -1,16 +1,63 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from functools import lru_cache
+from json import dumps
+from urllib.parse import quote
+
 import jmespath
 import requests
-from cached_property import cached_property
+
+from . import decode, metrics
+from .cache import DEFAULT_TTL, cached, invalidate_tags, tag_version
+from .export import prefetched, stream_docs
+from .httpcache import DiskResponseCache, ResponseCache
+from .indexer import DocumentIndexer
+from .mirror import ConfigMirror
+from .resilience import PolicyTransport, SolrError, policy
+from .session import sessions
+from .synonyms import SynonymImporter
+
+
+@lru_cache(maxsize=256)
+def _compile(path_query):
+    return jmespath.compile(path_query)
 
 
 def _build_path(*segments):
     return '/'.join([s.strip('/') for s in list(segments) if s and s.strip('/')])
 
 
+def _command_body(commands):
+    """Serialise ``(command, value)`` pairs as one JSON object, keeping repeated commands in order."""
+    body = '{%s}' % ', '.join(['%s: %s' % (dumps(command), dumps(value)) for command, value in commands])
+    return body.encode('utf-8')
+
+
+def enable_response_cache(directory=None):
+    """Send conditional GETs from every endpoint, keeping bodies in memory or under ``directory``."""
+    _Endpoint.response_cache = DiskResponseCache(directory) if directory else ResponseCache()
+    return _Endpoint.response_cache
+
+
+def disable_response_cache():
+    _Endpoint.response_cache = None
+
+
+def set_request_policy(request_policy):
+    """Send every endpoint's requests through ``request_policy``; ``None`` disables retries and breakers."""
+    _Endpoint.policy = request_policy
+
+
 class _Endpoint(object):
+    sessions = sessions
+    response_cache = None
+    policy = policy
 
     def __init__(self, uri):
         self.endpoint = uri
@@ -20,32 +67,143 @@ class _Endpoint(object):
             return None
 
         url = _build_path(self.endpoint, path)
+        kwargs['key'] = (self.endpoint, path.strip('/'))
+
+        if metrics.hooks:
+            return self._instrumented_request(method, url, **kwargs)
+
+        return self._send(method, url, **kwargs)
+
+    def _send(self, method, url, idempotent=None, key=None, **kwargs):
+        transport = self.sessions
+        if self.policy is not None:
+            transport = PolicyTransport(self.policy, self.sessions, idempotent=idempotent, key=key)
+
+        if self.response_cache is None:
+            return transport.request(method=method, url=url, **kwargs)
+
+        return self.response_cache.send(transport, self.endpoint, method, url, **kwargs)
 
+    def _instrumented_request(self, method, url, **kwargs):
+        started = time.time()
+        response = None
         try:
-            return requests.request(method=method, url=url, **kwargs)
-        except requests.ConnectionError:
-            return None
+            response = self._send(method, url, **kwargs)
+            return response
+        finally:
+            size = 0
+            from_cache = getattr(response, 'from_cache', False)
+            if response is not None and not from_cache:
+                size = int(response.headers.get('content-length') or 0)
+                if not size and not kwargs.get('stream'):
+                    size = len(response.content)
+            metrics.emit({
+                'kind': 'request',
+                'endpoint': type(self).__name__,
+                'method': method.upper(),
+                'path': url[len(self.endpoint):] or '/',
+                'params': kwargs.get('params'),
+                'status': response.status_code if response is not None else None,
+                'bytes': size,
+                'cached': from_cache,
+                'elapsed': time.time() - started
+            })
+
+    @property
+    def _cache_scope(self):
+        return (None, None)
+
+    def _invalidate(self, *tags):
+        invalidate_tags(self._cache_scope, *tags)
+
+    @staticmethod
+    def _checked(payload, action):
+        """Return ``payload``, raising ``SolrError`` when Solr answered with an ``error``."""
+        if 'error' in payload:
+            raise SolrError('%s failed: %s' % (action, payload['error'].get('msg')))
+        return payload
+
+    @property
+    def session_stats(self):
+        return self.sessions.stats(self.endpoint)
 
-    def _json_request(self, method='get', path='', **kwargs):
+    def _json_request(self, method='get', path='', select=None, **kwargs):
         params = kwargs.setdefault('params', {})
         params['wt'] = 'json'
+        if select:
+            kwargs['stream'] = True
 
         response = self._request(method=method, path=path, **kwargs)
-        content_type = response.headers.get('content-type')
-
-        if not content_type or 'application/json' not in content_type:
+        if response is None:
             return {}
 
-        return response.json()
+        try:
+            content_type = response.headers.get('content-type')
+
+            if not content_type or 'application/json' not in content_type:
+                return {}
+
+            if select:
+                return decode.select(response.iter_content(chunk_size=decode.CHUNK_SIZE), select)
+
+            return decode.loads(response.content)
+        finally:
+            response.close()
+
+
+class _SingleFlight(object):
+    """Runs one call per key at a time; concurrent callers wait for and share its outcome.
+
+    Keys include the version of the cache tag the result is stored under, so a
+    caller arriving after an invalidation never joins a call started before it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event()}
+
+        if not leader:
+            call['done'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as error:
+            call['error'] = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
 
 
 class SystemAPI(_Endpoint):
+    bulk_workers = 8
+
     def __init__(self, base_uri):
         self.base_uri = base_uri
+        self._flight = _SingleFlight()
         _Endpoint.__init__(self, _build_path(self.base_uri, 'admin'))
 
-    @cached_property
+    @property
+    def _cache_scope(self):
+        return (self.base_uri, None)
+
+    @cached(ttl=DEFAULT_TTL, tags=('info',))
     def _info(self):
+        return self._flight.do(('info', tag_version(self._cache_scope, 'info')), self._fetch_info)
+
+    def _fetch_info(self):
         json = self._json_request(path='info/system')
 
         if type(json) is dict:
@@ -53,8 +211,11 @@ class SystemAPI(_Endpoint):
 
         return {}
 
-    @cached_property
+    @cached(ttl=DEFAULT_TTL, tags=('cores',))
     def cores(self):
+        return self._flight.do(('cores', tag_version(self._cache_scope, 'cores')), self._fetch_cores)
+
+    def _fetch_cores(self):
         params = {
             'action': 'STATUS',
             'indexInfo': 'false'
@@ -66,8 +227,11 @@ class SystemAPI(_Endpoint):
         return {}
 
     def _invalidate_cores(self):
-        if 'cores' in self.__dict__:
-            del self.__dict__['cores']
+        self._invalidate('cores')
+
+    def _invalidate_core(self, core):
+        self._invalidate_cores()
+        invalidate_tags((self.base_uri, core), 'schema', 'config', 'resources', 'synonyms', 'stopwords', 'paths', 'files')
 
     @property
     def home(self):
@@ -89,7 +253,16 @@ class SystemAPI(_Endpoint):
     def jvm(self):
         return self._info.get('jvm')
 
-    def create_core(self, core, config=None, schema=None):
+    @cached(ttl=DEFAULT_TTL, tags=('info',))
+    def live_nodes(self):
+        """SolrCloud node names (``host:port_context``) reported by this node; empty outside cloud mode."""
+        if self.mode != 'solrcloud':
+            return []
+
+        payload = self._json_request(path='collections', params={'action': 'CLUSTERSTATUS'})
+        return payload.get('cluster', {}).get('live_nodes', [])
+
+    def _create_core(self, core, config=None, schema=None):
         params = {
             'action': 'CREATE',
             'name': '%s' % core
@@ -99,45 +272,172 @@ class SystemAPI(_Endpoint):
         if schema:
             params['schema'] = schema
 
-        self._json_request(path='cores', params=params)
-        self._invalidate_cores()
+        return self._json_request(path='cores', params=params, idempotent=False)
+
+    def create_core(self, core, config=None, schema=None):
+        self._create_core(core, config=config, schema=schema)
+        self._invalidate_core(core)
 
     def reload_core(self, core):
         params = {
             'action': 'RELOAD',
             'core': '%s' % core
         }
-        return self._json_request(path='cores', params=params)
+        return self._json_request(path='cores', params=params, idempotent=False)
 
-    def unload_core(self, core):
+    def _unload_core(self, core):
         params = {
             'action': 'UNLOAD',
             'deleteInstanceDir': 'true',
             'core': '%s' % core
         }
-        self._json_request(path='cores', params=params)
-        self._invalidate_cores()
+        return self._json_request(path='cores', params=params, idempotent=False)
+
+    def unload_core(self, core):
+        self._unload_core(core)
+        self._invalidate_core(core)
+
+    def _bulk(self, action, calls, workers=None):
+        """Run ``action`` per core concurrently; returns a report of responses and errors per core.
+
+        A core whose request raised or whose response carries a Solr ``error``
+        is listed under ``errors`` only.
+        """
+        with ThreadPoolExecutor(max_workers=workers or self.bulk_workers) as executor:
+            futures = [(name, executor.submit(action, **kwargs)) for name, kwargs in calls]
+
+        report = {'responses': {}, 'errors': {}}
+        for name, future in futures:
+            try:
+                response = future.result()
+            except Exception as error:
+                report['errors'][name] = '%s: %s' % (type(error).__name__, error)
+                continue
+
+            if 'error' in response:
+                report['errors'][name] = response['error'].get('msg', 'core admin request failed')
+            else:
+                report['responses'][name] = response
+
+        return report
+
+    def create_cores(self, cores, workers=None, wait=True, timeout=60):
+        """Create many cores concurrently and refresh the cores cache once.
+
+        ``cores`` holds core names or dicts with ``core`` and optional ``config``
+        and ``schema`` keys. Returns the admin response per created core under
+        ``responses``, the error of each core whose request failed or was
+        rejected under ``errors`` and, with ``wait``, the created cores still
+        missing when ``timeout`` ran out under ``pending``.
+        """
+        calls = []
+        for core in cores:
+            kwargs = dict(core) if isinstance(core, dict) else {'core': core}
+            calls.append((kwargs['core'], kwargs))
+
+        report = self._bulk(self._create_core, calls, workers=workers)
+        for name, _ in calls:
+            self._invalidate_core(name)
+
+        report['pending'] = []
+        if wait and report['responses']:
+            report['pending'] = self.wait_for_cores(list(report['responses']), timeout=timeout)
+
+        return report
+
+    def reload_cores(self, cores, workers=None):
+        return self._bulk(self.reload_core, [(core, {'core': core}) for core in cores], workers=workers)
+
+    def unload_cores(self, cores, workers=None, wait=True, timeout=60):
+        report = self._bulk(self._unload_core, [(core, {'core': core}) for core in cores], workers=workers)
+        for core in cores:
+            self._invalidate_core(core)
+
+        report['pending'] = []
+        if wait and report['responses']:
+            report['pending'] = self.wait_for_cores(list(report['responses']), present=False, timeout=timeout)
+
+        return report
+
+    def wait_for_cores(self, cores, present=True, timeout=60, interval=0.1, max_interval=2.0):
+        """Poll core STATUS until all ``cores`` are (or are no longer) registered.
+
+        Every poll is one STATUS request covering all cores; the interval doubles up
+        to ``max_interval``. Returns the cores still pending when ``timeout`` ran out.
+        """
+        deadline = time.time() + timeout
+        pending = list(cores)
+
+        while True:
+            status = self.cores
+            pending = [core for core in pending if (core in status) != present]
+            if not pending or time.time() >= deadline:
+                return pending
+
+            time.sleep(min(interval, max(deadline - time.time(), 0)))
+            interval = min(interval * 2, max_interval)
+            self._invalidate_cores()
+
+    def core_status(self, paths, core=None, index_info=False):
+        """Fetch STATUS decoding only ``paths`` below each core, e.g. ``['instanceDir']``.
+
+        Unlike ``cores`` the result is not cached; the rest of the payload is
+        skipped while decoding, so selecting a few values stays cheap on big nodes.
+        """
+        params = {
+            'action': 'STATUS',
+            'indexInfo': 'true' if index_info else 'false'
+        }
+        if core:
+            params['core'] = core
+
+        payload = self._json_request(path='cores', params=params, select=['status.*.%s' % p for p in paths])
+        return payload.get('status', {})
 
     def core_exists(self, core):
         return core in self.cores
 
     def search_cores(self, path_query):
-        return jmespath.search(path_query, self.cores)
+        return _compile(path_query).search(self.cores)
+
+
+_systems = {}
+_systems_lock = threading.Lock()
+
+
+def get_system(base_uri):
+    """Return the process-wide ``SystemAPI`` for ``base_uri``, creating it on first use."""
+    key = base_uri.rstrip('/')
+    with _systems_lock:
+        system = _systems.get(key)
+        if system is None:
+            system = _systems[key] = SystemAPI(key)
+
+    return system
+
+
+def clear_systems():
+    with _systems_lock:
+        _systems.clear()
 
 
 class _Base(_Endpoint):
     def __init__(self, base_uri=None, path=None, system=None):
         self.system = system
         if not self.system:
-            self.system = SystemAPI(base_uri)
+            self.system = get_system(base_uri)
 
         _Endpoint.__init__(self, _build_path(self.system.base_uri, path))
 
+    @property
+    def _cache_scope(self):
+        return (self.system.base_uri, None)
+
 
 class Core(object):
     def __init__(self, base_uri, core_name):
         self.name = core_name
-        self.system = SystemAPI(base_uri=base_uri)
+        self.system = get_system(base_uri)
         self._config = None
         self._schema = None
 
@@ -198,10 +498,118 @@ class _CoreAware(_Base):
         path = self.core.path(endpoint)
         _Base.__init__(self, path=path, system=self.core.system)
 
+    @property
+    def _cache_scope(self):
+        return (self.system.base_uri, self.core.name)
+
 
 class ConfigAPI(_CoreAware):
+    _component_map = {
+        'requesthandler': 'requestHandler',
+        'searchcomponent': 'searchComponent',
+        'initparams': 'initParams',
+        'queryresponsewriter': 'queryResponseWriter',
+        'queryparser': 'queryParser',
+        'valuesourceparser': 'valueSourceParser',
+        'transformer': 'transformer',
+        'updateprocessor': 'updateProcessor'
+    }
+
     def __init__(self, base_uri, core):
         _CoreAware.__init__(self, base_uri=base_uri, core=core, endpoint='config')
+        self.commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+    @cached(ttl=DEFAULT_TTL, tags=('config',))
+    def config(self):
+        if self.core.exists:
+            json = self._json_request()
+            if 'config' in json:
+                return json['config']
+
+        return {}
+
+    @cached(ttl=DEFAULT_TTL, tags=('config',))
+    def overlay(self):
+        if self.core.exists:
+            json = self._json_request(path='overlay')
+            if 'overlay' in json:
+                return json['overlay']
+
+        return {}
+
+    def _invalidate_config(self):
+        self._invalidate('config', 'paths', 'files')
+
+    @property
+    def props(self):
+        return self.overlay.get('props', {})
+
+    @property
+    def user_props(self):
+        return self.overlay.get('userProps', {})
+
+    def search(self, path_query):
+        return _compile(path_query).search(self.config)
+
+    def get_component(self, kind, name):
+        if kind not in self._component_map:
+            return None
+
+        return (self.config.get(self._component_map[kind]) or {}).get(name)
+
+    def queue(self, command, value):
+        """Queue a raw Config API command; nothing is sent until ``commit``."""
+        self.commands.append((command, value))
+        return self
+
+    def set_property(self, name, value):
+        return self.queue('set-property', {name: value})
+
+    def unset_property(self, name):
+        return self.queue('unset-property', name)
+
+    def set_user_property(self, name, value):
+        return self.queue('set-user-property', {name: value})
+
+    def unset_user_property(self, name):
+        return self.queue('unset-user-property', name)
+
+    def modify_component(self, kind, component):
+        """Queue ``add-<kind>`` or ``update-<kind>`` depending on whether ``component`` exists."""
+        if kind not in self._component_map:
+            return None
+
+        if type(component) is not dict or 'name' not in component:
+            return None
+
+        action = 'update' if self.get_component(kind, component['name']) else 'add'
+        return self.queue('%s-%s' % (action, kind), component)
+
+    def delete_component(self, kind, name):
+        if not self.get_component(kind, name):
+            return self
+
+        return self.queue('delete-%s' % kind, name)
+
+    def commit(self):
+        """Send all queued commands in one POST and refresh the cached config once."""
+        if not self.commands:
+            return {}
+
+        body = _command_body(self.commands)
+        self.commands = []
+
+        response = self._json_request(method='post', data=body, headers={'Content-Type': 'application/json'})
+        self._invalidate_config()
+
+        return response
 
 
 class SchemaAdmin(_CoreAware):
@@ -214,8 +622,9 @@ class SchemaAdmin(_CoreAware):
 
     def __init__(self, base_uri, core):
         _CoreAware.__init__(self, base_uri=base_uri, core=core, endpoint='schema')
+        self._transaction = None
 
-    @cached_property
+    @cached(ttl=DEFAULT_TTL, tags=('schema',))
     def schema(self):
         if self.core.exists:
             json = self._json_request()
@@ -225,8 +634,15 @@ class SchemaAdmin(_CoreAware):
         return {}
 
     def _invalidate_schema(self):
-        if 'schema' in self.__dict__:
-            del self.__dict__['schema']
+        self._invalidate('schema')
+
+    @cached(depends=('schema',))
+    def _elements(self):
+        index = {}
+        for element_type, key in self._element_map.items():
+            index[element_type] = dict((e['name'], e) for e in self.schema.get(key) or [] if 'name' in e)
+
+        return index
 
     @property
     def schema_xml(self):
@@ -246,28 +662,41 @@ class SchemaAdmin(_CoreAware):
         return self.search('version')
 
     def search(self, path_query):
-        return jmespath.search(path_query, self.schema)
+        return _compile(path_query).search(self.schema)
+
+    @staticmethod
+    def _element_name(element):
+        if type(element) is dict and 'name' in element:
+            return element['name']
+
+        if type(element) is str:
+            return element
+
+        return None
 
     def get_element(self, element_type, element):
         if element_type not in self._element_map:
             return None
 
-        name = None
-
-        if type(element) is dict and 'name' in element:
-            name = element['name']
-
-        if type(element) is str:
-            name = element
+        name = self._element_name(element)
 
         if not name:
             return None
 
-        path_query = "%s[?name=='%s'] | [0]" % (self._element_map[element_type], name)
+        return self._elements[element_type].get(name)
 
-        return self.search(path_query)
+    def batch(self):
+        """Start a transaction; use it as a context manager to commit on exit.
+
+        While the transaction is active ``modify_element`` and ``delete_element``
+        queue their commands on it instead of posting them one by one.
+        """
+        return SchemaTransaction(self)
 
     def modify_element(self, element_type, element):
+        if self._transaction is not None:
+            return self._transaction.modify_element(element_type, element)
+
         if element_type not in self._element_map:
             return None
 
@@ -287,6 +716,9 @@ class SchemaAdmin(_CoreAware):
         return self.get_element(element_type, element)
 
     def delete_element(self, element_type, element):
+        if self._transaction is not None:
+            return self._transaction.delete_element(element_type, element)
+
         if not bool(self.get_element(element_type, element)):
             return
 
@@ -296,6 +728,77 @@ class SchemaAdmin(_CoreAware):
         self._invalidate_schema()
 
 
+class SchemaTransaction(object):
+    """Schema API commands collected and sent to Solr in a single POST.
+
+    Solr applies the commands in order, so the same command may appear more than
+    once in the request body. The schema of the admin is refreshed once on commit.
+    """
+
+    def __init__(self, admin):
+        self.admin = admin
+        self.commands = []
+        self._exists = {}
+
+    def __enter__(self):
+        self.admin._transaction = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.admin._transaction = None
+        if exc_type is None:
+            self.commit()
+
+    def __len__(self):
+        return len(self.commands)
+
+    def _element_exists(self, element_type, element):
+        key = (element_type, self.admin._element_name(element))
+        if key not in self._exists:
+            self._exists[key] = bool(self.admin.get_element(element_type, element))
+
+        return self._exists[key]
+
+    def modify_element(self, element_type, element):
+        if element_type not in self.admin._element_map:
+            return None
+
+        if type(element) is not dict or 'name' not in element:
+            return None
+
+        action = 'add'
+
+        if self._element_exists(element_type, element):
+            action = 'replace'
+
+        self.commands.append(('%s-%s' % (action, element_type), element))
+        self._exists[(element_type, element['name'])] = True
+
+        return element
+
+    def delete_element(self, element_type, element):
+        if not self._element_exists(element_type, element):
+            return
+
+        self.commands.append(('delete-%s' % element_type, element))
+        self._exists[(element_type, self.admin._element_name(element))] = False
+
+    def commit(self):
+        if not self.commands:
+            return {}
+
+        body = _command_body(self.commands)
+        headers = {'Content-Type': 'application/json'}
+
+        self.commands = []
+        self._exists = {}
+
+        response = self.admin._json_request(method='post', data=body, headers=headers)
+        self.admin._invalidate_schema()
+
+        return response
+
+
 class ManagedResources(_CoreAware):
     _managed_classes = {
         'stopwords': 'org.apache.solr.rest.schema.analysis.ManagedWordSetResource',
@@ -305,7 +808,7 @@ class ManagedResources(_CoreAware):
     def __init__(self, base_uri, core):
         _CoreAware.__init__(self, base_uri=base_uri, core=core)
 
-    @cached_property
+    @cached(ttl=DEFAULT_TTL, tags=('resources',))
     def resources(self):
         if not self.core.exists:
             return None
@@ -317,8 +820,7 @@ class ManagedResources(_CoreAware):
         return {}
 
     def _invalidate_resources(self):
-        if 'resources' in self.__dict__:
-            del self.__dict__['resources']
+        self._invalidate('resources')
 
     def get_resource(self, type_name, resource_name):
         path = '/schema/analysis/%s/%s' % (type_name, resource_name)
@@ -337,7 +839,7 @@ class ManagedResources(_CoreAware):
 
         data = {'class': self._managed_classes[type_name]}
         path = '/schema/analysis/%s/%s' % (type_name, resource_name)
-        self._json_request(method='put', path=path, json=data)
+        self._checked(self._json_request(method='put', path=path, json=data), 'create %s' % path)
         self._invalidate_resources()
 
         return self.get_resource(type_name, resource_name)
@@ -347,23 +849,68 @@ class ManagedResources(_CoreAware):
         if not resource:
             return None
 
-        self._json_request(method='delete', path=resource['resourceId'])
+        self._checked(self._json_request(method='delete', path=resource['resourceId']),
+                      'delete %s' % resource['resourceId'])
         self._invalidate_resources()
         return resource
 
 
-class SynonymResource(_Base):
+class _ManagedResource(_Base):
+    _type_name = None
+    _tag = None
+    delete_workers = 8
+
     def __init__(self, base_uri, core, name):
         self.name = name
         self.api = ManagedResources(base_uri=base_uri, core=core)
         path = _build_path(self.api.core.name, self.resource['resourceId'])
         _Base.__init__(self, path=path, system=self.api.system)
 
-    @cached_property
+    @property
+    def _cache_scope(self):
+        return (self.api.system.base_uri, self.api.core.name)
+
+    @cached(tags=('resources',))
     def resource(self):
-        return self.api.create_resource('synonyms', self.name)
+        return self.api.create_resource(self._type_name, self.name)
+
+    @property
+    def _managed(self):
+        return getattr(self, self._tag)
+
+    def _invalidate_managed(self):
+        self._invalidate(self._tag)
+
+    @property
+    def init_args(self):
+        if 'initArgs' in self._managed:
+            return self._managed['initArgs']
+        return {}
+
+    @init_args.setter
+    def init_args(self, value):
+        data = {'initArgs': value}
+        self._json_request(method='post', json=data)
+        self._invalidate_managed()
+
+    def _normalize(self, term):
+        if self.init_args.get('ignoreCase'):
+            return term.lower()
+        return term
+
+    def _delete_entries(self, entries, workers=None):
+        def delete(entry):
+            return self._checked(self._json_request(method='delete', path=quote(entry, safe='')), 'delete %s' % entry)
+
+        with ThreadPoolExecutor(max_workers=workers or self.delete_workers) as executor:
+            return list(executor.map(delete, entries))
 
-    @cached_property
+
+class SynonymResource(_ManagedResource):
+    _type_name = 'synonyms'
+    _tag = 'synonyms'
+
+    @cached(ttl=DEFAULT_TTL, tags=('synonyms',))
     def synonyms(self):
         json = self._json_request()
         if 'synonymMappings' in json:
@@ -372,8 +919,7 @@ class SynonymResource(_Base):
         return {}
 
     def _invalidate_synonyms(self):
-        if 'synonyms' in self.__dict__:
-            del self.__dict__['synonyms']
+        self._invalidate('synonyms')
 
     @property
     def map(self):
@@ -381,20 +927,12 @@ class SynonymResource(_Base):
             return self.synonyms['managedMap']
         return {}
 
-    @property
-    def init_args(self):
-        if 'initArgs' in self.synonyms:
-            return self.synonyms['initArgs']
-        return {}
-
-    @init_args.setter
-    def init_args(self, value):
-        data = {'initArgs': value}
-        self._json_request(method='post', json=data)
-        self._invalidate_synonyms()
+    @cached(depends=('synonyms',))
+    def map_index(self):
+        return dict((key, set(values)) for key, values in self.map.items())
 
     def delete_synonym(self, synonym):
-        if synonym not in self.synonyms:
+        if synonym not in self.map:
             return self
         self._json_request(method='delete', path=synonym)
         self._invalidate_synonyms()
@@ -404,20 +942,63 @@ class SynonymResource(_Base):
         if self.in_map(synonym_map):
             return self
 
-        self._json_request(method='put', json=synonym_map)
+        self._checked(self._json_request(method='put', json=synonym_map), 'append synonyms')
         self._invalidate_synonyms()
         return self
 
     def in_map(self, synonym_map):
         mapped = self.map_list(synonym_map)
-        for key, synonyms in mapped.iteritems():
-            if key not in self.map:
+        index = self.map_index
+        for key, synonyms in mapped.items():
+            if key not in index:
                 return False
-            if not set(synonyms) <= set(self.map[key]):
+            if not index[key].issuperset(synonyms):
                 return False
 
         return True
 
+    def import_synonyms(self, lines, max_bytes=512 * 1024, max_entries=5000):
+        """Import Solr-format synonym rules from ``lines`` (e.g. an open synonyms.txt).
+
+        Only mappings missing from the resource are sent, in PUTs bounded by
+        ``max_bytes`` and ``max_entries``. Returns counts and throughput.
+        """
+        return SynonymImporter(self, max_bytes=max_bytes, max_entries=max_entries).run(lines)
+
+    def sync(self, desired, workers=None):
+        """Make the managed map equal to ``desired`` with the fewest requests.
+
+        ``desired`` is a mapping of term to synonyms or a list of equivalence
+        groups. Keys that disappeared or lost synonyms are deleted concurrently,
+        then all additions go out in one PUT. Nothing is sent when the live map
+        already matches.
+        """
+        groups = [desired] if isinstance(desired, dict) else [self.map_list(group) for group in desired]
+        wanted = {}
+        for group in groups:
+            for key, synonyms in group.items():
+                synonyms = [synonyms] if isinstance(synonyms, str) else synonyms
+                wanted.setdefault(self._normalize(key), set()).update(self._normalize(s) for s in synonyms)
+
+        live = self.map_index
+        removed = sorted(key for key, synonyms in live.items() if not synonyms <= wanted.get(key, set()))
+        recreated = set(removed)
+
+        added = {}
+        for key, synonyms in wanted.items():
+            missing = synonyms if key in recreated else synonyms - live.get(key, set())
+            if missing:
+                added[key] = sorted(missing)
+
+        if removed:
+            self._delete_entries(removed, workers=workers)
+        if added:
+            self._checked(self._json_request(method='put', json=added), 'add synonyms')
+        if removed or added:
+            self._invalidate_synonyms()
+
+        return {'added': added, 'removed': removed, 'requests': len(removed) + bool(added)}
+
     @staticmethod
     def map_list(synonym_map):
         if type(synonym_map) is dict:
@@ -430,26 +1011,111 @@ class SynonymResource(_Base):
         return mapped
 
 
+class StopwordResource(_ManagedResource):
+    _type_name = 'stopwords'
+    _tag = 'stopwords'
+
+    @cached(ttl=DEFAULT_TTL, tags=('stopwords',))
+    def stopwords(self):
+        json = self._json_request()
+        if 'wordSet' in json:
+            return json['wordSet']
+
+        return {}
+
+    def _invalidate_stopwords(self):
+        self._invalidate('stopwords')
+
+    @property
+    def words(self):
+        if 'managedList' in self.stopwords:
+            return self.stopwords['managedList']
+        return []
+
+    @cached(depends=('stopwords',))
+    def word_set(self):
+        return set(self.words)
+
+    def append_words(self, words):
+        missing = [w for w in words if self._normalize(w) not in self.word_set]
+        if not missing:
+            return self
+
+        self._checked(self._json_request(method='put', json=missing), 'append stopwords')
+        self._invalidate_stopwords()
+        return self
+
+    def delete_word(self, word):
+        if word not in self.word_set:
+            return self
+        self._json_request(method='delete', path=quote(word, safe=''))
+        self._invalidate_stopwords()
+        return self
+
+    def sync(self, desired, workers=None):
+        """Make the word set equal to ``desired``: one PUT for additions, concurrent DELETEs for removals."""
+        wanted = set(self._normalize(word) for word in desired)
+        live = self.word_set
+        added = sorted(wanted - live)
+        removed = sorted(live - wanted)
+
+        if removed:
+            self._delete_entries(removed, workers=workers)
+        if added:
+            self._checked(self._json_request(method='put', json=added), 'add stopwords')
+        if removed or added:
+            self._invalidate_stopwords()
+
+        return {'added': added, 'removed': removed, 'requests': len(removed) + bool(added)}
+
+
 class FileAdmin(_CoreAware):
-    def __init__(self, base_uri, core):
+    walk_workers = 4
+
+    def __init__(self, base_uri, core, mirror_dir=None):
         _CoreAware.__init__(self, base_uri=base_uri, core=core, endpoint='admin/file')
+        self.mirror = ConfigMirror(self, mirror_dir) if mirror_dir else None
 
-    def _get_fs(self, path):
+    def _list_dir(self, path):
         json = self._json_request(params={'file': _build_path(path)})
         if 'files' not in json:
             return []
 
-        paths = []
-        for p, f in json['files'].items():
-            if 'directory' not in f:
-                paths.append(_build_path(path, p))
-                continue
+        return sorted(json['files'].items())
+
+    def walk(self, path='/', max_depth=None, pattern=None, workers=None, details=False):
+        """Yield the file paths below ``path`` breadth first.
 
-            paths += self._get_fs(_build_path(path, p))
+        Sibling directories are listed concurrently on ``workers`` threads while
+        paths are streamed in a stable order. ``max_depth`` limits how many
+        directory levels below ``path`` are entered (0 lists ``path`` only) and
+        ``pattern`` is a glob the yielded paths must match. With ``details`` set,
+        ``(path, listing)`` tuples are yielded instead, carrying size and modified time.
+        """
+        executor = ThreadPoolExecutor(max_workers=workers or self.walk_workers)
+        pending = deque([(executor.submit(self._list_dir, path), path, 0)])
 
-        return paths
+        try:
+            while pending:
+                future, directory, depth = pending.popleft()
+                for name, info in future.result():
+                    entry = _build_path(directory, name)
+                    if 'directory' not in info:
+                        if not pattern or fnmatch(entry, pattern):
+                            yield (entry, info) if details else entry
+                        continue
+
+                    if max_depth is None or depth < max_depth:
+                        pending.append((executor.submit(self._list_dir, entry), entry, depth + 1))
+        finally:
+            for future, _, _ in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _get_fs(self, path):
+        return list(self.walk(path))
 
-    @cached_property
+    @cached(ttl=DEFAULT_TTL, tags=('paths',))
     def paths(self):
         if not self.core.exists:
             return []
@@ -463,6 +1129,9 @@ class FileAdmin(_CoreAware):
         if not self.file_exists(file_path):
             return None
 
+        if self.mirror:
+            return self.mirror.read(file_path)
+
         params = {'file': _build_path(file_path)}
 
         response = self._request(method='get', params=params)
@@ -471,21 +1140,173 @@ class FileAdmin(_CoreAware):
 
         return response.content
 
-    @cached_property
+    @cached(ttl=DEFAULT_TTL, tags=('files',))
     def config(self):
         return self.get_file_content(self.core.config)
 
-    @cached_property
+    @cached(ttl=DEFAULT_TTL, tags=('files',))
     def schema(self):
         return self.get_file_content(self.core.schema)
 
 
+class UpdateAPI(_CoreAware):
+    index_workers = 4
+
+    def __init__(self, base_uri, core):
+        _CoreAware.__init__(self, base_uri=base_uri, core=core, endpoint='update')
+
+    def _post(self, body, commit_within=None, commit=False):
+        params = {}
+        if commit_within:
+            params['commitWithin'] = commit_within
+        if commit:
+            params['commit'] = 'true'
+
+        return self._json_request(method='post', data=body, params=params, headers={'Content-Type': 'application/json'})
+
+    def add(self, documents, commit_within=None):
+        return self._post(dumps(list(documents)).encode('utf-8'), commit_within=commit_within)
+
+    def delete(self, ids=None, query=None, commit_within=None):
+        commands = []
+        if ids:
+            commands.append(('delete', list(ids)))
+        if query:
+            commands.append(('delete', {'query': query}))
+
+        return self._post(_command_body(commands), commit_within=commit_within)
+
+    def commit(self):
+        return self._post(_command_body([('commit', {})]))
+
+    def index(self, documents, max_bytes=1024 * 1024, max_docs=1000, workers=None, commit_within=10000, commit=False):
+        """Stream ``documents`` (any iterable, e.g. a generator) into the core.
+
+        Documents are posted in JSON batches bounded by ``max_bytes`` and
+        ``max_docs`` from ``workers`` concurrent requests, relying on
+        ``commitWithin`` rather than per-batch commits; ``commit`` sends one
+        hard commit at the end. Returns counts, failed batches and docs/sec.
+        """
+        indexer = DocumentIndexer(self, max_bytes=max_bytes, max_docs=max_docs, workers=workers or self.index_workers,
+                                  commit_within=commit_within)
+        report = indexer.run(documents)
+        if commit:
+            self.commit()
+
+        return report
+
+
+class QueryAPI(_CoreAware):
+    export_chunk_size = 64 * 1024
+
+    def __init__(self, base_uri, core):
+        _CoreAware.__init__(self, base_uri=base_uri, core=core)
+        self.schema = SchemaAdmin(base_uri=self.system.base_uri, core=core)
+
+    def select(self, q='*:*', **params):
+        params['q'] = q
+        return self._json_request(path='select', params=params)
+
+    def _exportable(self, fields, sort):
+        """``/export`` needs docValues on every returned field and every sort field."""
+        if not fields:
+            return False
+
+        sort_fields = [clause.split()[0] for clause in sort.split(',') if clause.strip()]
+        for name in list(fields) + sort_fields:
+            field = self.schema.get_element('field', name)
+            if not field or '*' in name:
+                return False
+            field_type = self.schema.get_element('field-type', field.get('type')) or {}
+            if not field.get('docValues', field_type.get('docValues')):
+                return False
+
+        return True
+
+    def _cursor_pages(self, params, rows):
+        params = dict(params, rows=rows, cursorMark='*')
+        while True:
+            payload = self._json_request(path='select', params=dict(params))
+            if 'error' in payload:
+                raise SolrError('query failed: %s' % payload['error'].get('msg'))
+
+            docs = payload.get('response', {}).get('docs', [])
+            if docs:
+                yield docs
+
+            cursor = payload.get('nextCursorMark')
+            if not docs or cursor is None or cursor == params['cursorMark']:
+                return
+            params['cursorMark'] = cursor
+
+    def _export_pages(self, params, rows):
+        params = dict(params, wt='json')
+        response = self._request(path='export', params=params, stream=True)
+        try:
+            response.raise_for_status()
+            for docs in stream_docs(response.iter_content(chunk_size=self.export_chunk_size), batch_size=rows):
+                yield docs
+        finally:
+            response.close()
+
+    def export(self, q='*:*', fields=None, sort=None, fq=None, rows=1000, prefetch=True, use_export=None):
+        """Yield every document matching ``q`` without deep paging.
+
+        Pages are walked with ``cursorMark``, sorted on ``sort`` plus the unique
+        key as tie-breaker. When every field in ``fields`` and in the sort,
+        tie-breaker included, has docValues (or ``use_export`` is true) the
+        ``/export`` handler streams the whole result
+        instead. With ``prefetch`` the next page is fetched on a background
+        thread while the current one is consumed.
+        """
+        unique_key = self.schema.unique_key or 'id'
+        sort = sort or '%s asc' % unique_key
+        if unique_key not in [clause.split()[0] for clause in sort.split(',') if clause.strip()]:
+            sort = '%s,%s asc' % (sort, unique_key)
+
+        params = {'q': q, 'sort': sort}
+        if fields:
+            params['fl'] = ','.join(fields)
+        if fq:
+            params['fq'] = fq
+
+        if use_export is None:
+            use_export = self._exportable(fields, sort)
+
+        if use_export:
+            pages = self._export_pages(params, rows)
+        else:
+            pages = self._cursor_pages(params, rows)
+
+        if prefetch:
+            pages = prefetched(pages)
+
+        for docs in pages:
+            for doc in docs:
+                yield doc
+
+    def export_jsonl(self, path, q='*:*', **kwargs):
+        """Write ``export(q, **kwargs)`` to ``path``, one JSON document per line; returns counts."""
+        started = time.time()
+        report = {'docs': 0, 'bytes': 0}
+        with open(path, mode='w', encoding='utf-8') as jsonl_file:
+            for doc in self.export(q=q, **kwargs):
+                line = dumps(doc, separators=(',', ':')) + '\n'
+                jsonl_file.write(line)
+                report['docs'] += 1
+                report['bytes'] += len(line)
+
+        report['elapsed'] = time.time() - started
+        report['docs_per_sec'] = report['docs'] / report['elapsed'] if report['elapsed'] else 0.0
+        return report
+
+
 def main():
 
     # pass
     s = FileAdmin('http://10.0.0.20:8983/solr', 'acsi')
 
-    print s.core.schema
+    print(s.core.schema)
     # print s.name
     # print s.unique_key
     # print s.version
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for ``solr.api`` against an in-process ``StubSolr`` node.
+
+Every scenario populates a fresh stub, runs one client workload and reports
+the round trips, response bytes and wall time it took. Results can be saved
+as a baseline and later runs compared against it::
+
+    python -m solr.bench --save solr/bench_baseline.json
+    python -m solr.bench --compare solr/bench_baseline.json --latency 0.002
+
+Each scenario runs ``--repeat`` times and keeps its median wall time. Round
+trips and bytes are deterministic and must not grow; wall time may drift by
+``--tolerance`` and by at least ``--min-delta`` seconds before a scenario
+counts as a regression, so timer noise on short scenarios is not reported.
+"""
+
+import json
+import sys
+import time
+from statistics import median
+
+from . import api, fanout, metrics
+from .stub import StubSolr
+
+SCENARIOS = []
+
+
+def scenario(**shape):
+    def register(fn):
+        SCENARIOS.append((fn.__name__, shape, fn))
+        return fn
+    return register
+
+
+@scenario(cores=200)
+def system_cores(base_uri):
+    system = api.get_system(base_uri)
+    for name in sorted(system.cores):
+        system.core_exists(name)
+        system.search_cores('%s.instanceDir' % name)
+
+
+@scenario(cores=1, fields=3000, dynamic_fields=500)
+def schema_lookup(base_uri):
+    admin = api.SchemaAdmin(base_uri, 'core_0000')
+    for f in range(0, 3000, 3):
+        admin.get_element('field', 'field_%05d' % f)
+    admin.search("fields[?stored] | length(@)")
+
+
+@scenario(cores=1, fields=100)
+def schema_batch(base_uri):
+    admin = api.SchemaAdmin(base_uri, 'core_0000')
+    with admin.batch():
+        for f in range(200):
+            admin.modify_element('field', {'name': 'field_%05d' % f, 'type': 'string'})
+
+
+@scenario(cores=1, tree_depth=3, tree_width=4, files_per_dir=5)
+def file_walk(base_uri):
+    api.FileAdmin(base_uri, 'core_0000').paths
+
+
+@scenario(cores=1, synonyms=20000)
+def synonym_in_map(base_uri):
+    resource = api.SynonymResource(base_uri, 'core_0000', 'synonyms')
+    for k in range(0, 20000, 2):
+        resource.in_map({'term_%06d' % k: ['alt_%06d' % k]})
+
+
+@scenario(cores=1, synonyms=10000)
+def synonym_import(base_uri):
+    resource = api.SynonymResource(base_uri, 'core_0000', 'synonyms')
+    resource.import_synonyms('term_%06d, alt_%06d, new_%06d' % (k, k, k) for k in range(20000))
+
+
+@scenario(cores=40, fields=50)
+def fanout_schema(base_uri):
+    fanout.FanOut(base_uri, workers=8).run([
+        fanout.modify_element('field', {'name': 'sku', 'type': 'string'}),
+        fanout.delete_element('field', 'field_00001')
+    ])
+
+
+def run_scenario(name, shape, fn, latency=0.0):
+    stub = StubSolr(latency=latency).populate(**shape).start_in_thread()
+    api.clear_systems()
+    try:
+        with metrics.profile() as recorded:
+            started = time.time()
+            fn(stub.base_uri)
+            elapsed = time.time() - started
+    finally:
+        stub.stop_thread()
+
+    requests = recorded.snapshot()['requests']
+    return {
+        'round_trips': sum(series['count'] for series in requests),
+        'bytes': sum(series['bytes'] for series in requests),
+        'seconds': elapsed
+    }
+
+
+def run(names=None, latency=0.0, repeat=5):
+    """Run each scenario ``repeat`` times; the largest counts and the median wall time are kept."""
+    results = {}
+    for name, shape, fn in SCENARIOS:
+        if names and name not in names:
+            continue
+        runs = [run_scenario(name, shape, fn, latency=latency) for _ in range(max(repeat, 1))]
+        results[name] = {
+            'round_trips': max(result['round_trips'] for result in runs),
+            'bytes': max(result['bytes'] for result in runs),
+            'seconds': median(result['seconds'] for result in runs)
+        }
+    return results
+
+
+def compare(results, baseline, tolerance=0.5, min_delta=0.05):
+    """Return ``(name, problem)`` pairs for scenarios that got worse than ``baseline``.
+
+    Wall time counts as worse only when it grew by more than ``tolerance``
+    relative to the baseline and by more than ``min_delta`` seconds.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        for counter in ('round_trips', 'bytes'):
+            if result[counter] > base[counter]:
+                regressions.append((name, '%s %d > %d' % (counter, result[counter], base[counter])))
+        slower = result['seconds'] - base['seconds']
+        if result['seconds'] > base['seconds'] * (1 + tolerance) and slower > min_delta:
+            regressions.append((name, 'seconds %.3f > %.3f' % (result['seconds'], base['seconds'])))
+    return regressions
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark solr.api against an in-process stub Solr")
+    parser.add_argument('scenarios', nargs='*', help="scenarios to run (default: all)")
+    parser.add_argument('-l', '--latency', type=float, default=0.0, help="seconds of latency added per request")
+    parser.add_argument('-s', '--save', help="write the results to this baseline file")
+    parser.add_argument('-c', '--compare', help="compare the results against this baseline file")
+    parser.add_argument('-t', '--tolerance', type=float, default=0.5, help="allowed relative wall time increase")
+    parser.add_argument('-d', '--min-delta', type=float, default=0.05,
+                        help="wall time increase in seconds always ignored (default: 0.05)")
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help="runs per scenario; the median wall time is kept (default: 5)")
+    args = parser.parse_args(argv)
+
+    results = run(args.scenarios, latency=args.latency, repeat=args.repeat)
+
+    print('%-16s %12s %12s %10s' % ('scenario', 'round trips', 'bytes', 'seconds'))
+    for name, result in sorted(results.items()):
+        print('%-16s %12d %12d %10.3f' % (name, result['round_trips'], result['bytes'], result['seconds']))
+
+    if args.save:
+        with open(args.save, mode='w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, mode='r') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), tolerance=args.tolerance,
+                                  min_delta=args.min_delta)
+        for name, problem in regressions:
+            print('regression: %s: %s' % (name, problem))
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
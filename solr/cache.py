@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Caching layer for the ``solr.api`` endpoint objects.
+
+``cached`` replaces ``cached_property``: values are stored per object, may
+expire after a TTL and are tagged so that a change on the server invalidates
+every object that cached something about it. Tags are versioned per scope,
+``(base_uri, core)``; bumping a tag version makes all entries taken under the
+previous version stale without having to find the objects that hold them.
+"""
+
+import threading
+import time
+from itertools import count
+
+from . import metrics
+
+DEFAULT_TTL = 300
+
+_versions = {}
+_versions_lock = threading.Lock()
+_serials = count(1)
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _count(key, counter):
+    with _stats_lock:
+        counters = _stats.setdefault(key, {'hits': 0, 'misses': 0, 'expired': 0, 'invalidated': 0})
+        counters[counter] += 1
+
+
+def invalidate_tags(scope, *tags):
+    """Make every value cached under ``tags`` in ``scope`` stale, on all objects."""
+    with _versions_lock:
+        for tag in tags:
+            key = tuple(scope) + (tag,)
+            _versions[key] = _versions.get(key, 0) + 1
+
+
+def tag_version(scope, tag):
+    """Current version of ``tag`` in ``scope``; it changes on every invalidation."""
+    with _versions_lock:
+        return _versions.get(tuple(scope) + (tag,), 0)
+
+
+def invalidate(obj, *names):
+    """Drop the cached ``names`` of a single object."""
+    entries = obj.__dict__.get('_cache_entries', {})
+    for name in names:
+        entry = entries.pop(name, None)
+        if entry is not None:
+            _count(entry.key, 'invalidated')
+
+
+def cache_info(obj):
+    """Return the age, TTL and hit count of each value cached on ``obj``."""
+    now = time.time()
+    info = {}
+    for name, entry in obj.__dict__.get('_cache_entries', {}).items():
+        ttl = getattr(type(obj), name).ttl
+        info[name] = {'age': now - entry.created, 'ttl': ttl, 'hits': entry.hits}
+    return info
+
+
+def stats():
+    """Return hit, miss, expiry and invalidation counters per cached attribute."""
+    with _stats_lock:
+        return dict((key, dict(counters)) for key, counters in _stats.items())
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class _Entry(object):
+    __slots__ = ('key', 'value', 'created', 'serial', 'versions', 'depends', 'hits')
+
+    def __init__(self, key, value, versions, depends):
+        self.key = key
+        self.value = value
+        self.created = time.time()
+        self.serial = next(_serials)
+        self.versions = versions
+        self.depends = depends
+        self.hits = 0
+
+
+class cached(object):
+    """Cached property with an optional TTL, invalidation tags and dependencies.
+
+    ``tags`` are resolved in the scope returned by the object's ``_cache_scope``.
+    ``depends`` names other cached attributes of the same object; the value is
+    recomputed whenever one of them has been.
+    """
+
+    def __init__(self, fn=None, ttl=None, tags=(), depends=()):
+        self.ttl = ttl
+        self.tags = tuple(tags)
+        self.depends = tuple(depends)
+        self.fn = None
+        if fn is not None:
+            self(fn)
+
+    def __call__(self, fn):
+        self.fn = fn
+        self.name = fn.__name__
+        self.key = fn.__qualname__
+        self.__doc__ = fn.__doc__
+        return self
+
+    def _tag_keys(self, obj):
+        scope = tuple(getattr(obj, '_cache_scope', ()))
+        return [scope + (tag,) for tag in self.tags]
+
+    def _stale(self, entry, tag_keys, depends):
+        if self.ttl is not None and time.time() - entry.created > self.ttl:
+            return 'expired'
+
+        if entry.depends != depends:
+            return 'invalidated'
+
+        if entry.versions != tuple(_versions.get(key, 0) for key in tag_keys):
+            return 'invalidated'
+
+        return None
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+
+        entries = obj.__dict__.setdefault('_cache_entries', {})
+        tag_keys = self._tag_keys(obj)
+        depends = tuple(self._serial(obj, name) for name in self.depends)
+
+        entry = entries.get(self.name)
+        if entry is not None:
+            reason = self._stale(entry, tag_keys, depends)
+            if not reason:
+                entry.hits += 1
+                _count(self.key, 'hits')
+                if metrics.hooks:
+                    metrics.emit({'kind': 'cache', 'attribute': self.key, 'hit': True})
+                return entry.value
+            _count(self.key, reason)
+
+        _count(self.key, 'misses')
+        if metrics.hooks:
+            metrics.emit({'kind': 'cache', 'attribute': self.key, 'hit': False})
+        versions = tuple(_versions.get(key, 0) for key in tag_keys)
+        value = self.fn(obj)
+        entries[self.name] = _Entry(self.key, value, versions, depends)
+        return value
+
+    @staticmethod
+    def _serial(obj, name):
+        getattr(obj, name)
+        return obj.__dict__['_cache_entries'][name].serial
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""One view over the cores of several Solr nodes.
+
+``Cluster`` reads ``info/system`` and core STATUS from every node
+concurrently and merges them into a view indexed by node and by core::
+
+    cluster = Cluster(['http://solr1:8983/solr', 'http://solr2:8983/solr'])
+    cluster.core_nodes('products')
+    cluster.search_cores("products.*.instanceDir")
+
+The merged view is built on first use and kept until ``refresh()``.
+In SolrCloud mode the nodes can instead be discovered from a single seed node,
+which reports the live nodes through the Collections API. Per-node results come
+from the shared ``api.get_system`` objects, so they are cached and invalidated
+exactly like single-node reads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+import requests
+
+from . import api
+from .cache import invalidate_tags
+from .resilience import SolrError
+
+
+def node_uri(node_name, scheme='http'):
+    """Turn a SolrCloud node name such as ``10.0.0.1:8983_solr`` into a base URI."""
+    address, _, context = node_name.partition('_')
+    return '%s://%s/%s' % (scheme, address, unquote(context).strip('/'))
+
+
+def discover_nodes(seed):
+    """Return the base URIs of the live nodes known to ``seed``, or ``[seed]`` outside cloud mode."""
+    seed = seed.rstrip('/')
+    scheme = urlsplit(seed).scheme or 'http'
+    live_nodes = api.get_system(seed).live_nodes
+    if not live_nodes:
+        return [seed]
+
+    return sorted(node_uri(node_name, scheme) for node_name in live_nodes)
+
+
+class Cluster(object):
+    workers = 8
+
+    def __init__(self, nodes=None, seed=None, workers=None):
+        if not nodes and not seed:
+            raise ValueError('a cluster needs a list of nodes or a seed node')
+
+        self.seed = seed
+        self._fixed = bool(nodes)
+        self._nodes = sorted(node.rstrip('/') for node in nodes) if nodes else None
+        self.workers = workers or self.workers
+        self.errors = {}
+        self._view = None
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self._nodes = discover_nodes(self.seed)
+        return self._nodes
+
+    def system(self, node):
+        return api.get_system(node)
+
+    def _collect(self, node):
+        system = self.system(node)
+        return {
+            'mode': system.mode,
+            'solr_home': system.home,
+            'lucene': system.lucene,
+            'cores': system.cores
+        }
+
+    def _gather(self):
+        nodes = self.nodes
+        with ThreadPoolExecutor(max_workers=max(min(self.workers, len(nodes)), 1)) as executor:
+            futures = [(node, executor.submit(self._collect, node)) for node in nodes]
+
+        collected = {}
+        errors = {}
+        for node, future in futures:
+            try:
+                collected[node] = future.result()
+            except (SolrError, requests.RequestException, ValueError) as error:
+                errors[node] = str(error) or type(error).__name__
+
+        self.errors = errors
+        return collected
+
+    def _merge(self):
+        by_node = self._gather()
+        by_core = {}
+        for node, info in by_node.items():
+            for core, status in info['cores'].items():
+                by_core.setdefault(core, {})[node] = status
+
+        return {'nodes': by_node, 'cores': by_core}
+
+    @property
+    def view(self):
+        """``{'nodes': {node: info}, 'cores': {core: {node: status}}}`` for every reachable node.
+
+        Nodes that failed are left out and listed in ``errors``. The view is
+        collected once and kept until ``refresh()``.
+        """
+        if self._view is None:
+            self._view = self._merge()
+        return self._view
+
+    def refresh(self):
+        """Re-read info and core status from every node, rediscovering nodes if seeded."""
+        for node in self._nodes or []:
+            invalidate_tags((node, None), 'info', 'cores')
+        if self.seed and not self._fixed:
+            invalidate_tags((self.seed.rstrip('/'), None), 'info')
+            self._nodes = None
+        self._view = self._merge()
+        return self._view
+
+    @property
+    def cores(self):
+        return self.view['cores']
+
+    def core_nodes(self, core):
+        return sorted(self.cores.get(core, {}))
+
+    def core_exists(self, core, node=None):
+        nodes = self.cores.get(core, {})
+        return node in nodes if node else bool(nodes)
+
+    def search_cores(self, path_query):
+        """Run a JMESPath query over ``{core: {node: status}}`` for the whole cluster."""
+        return api._compile(path_query).search(self.cores)
+
+    def search(self, path_query):
+        """Run a JMESPath query over the full ``view``."""
+        return api._compile(path_query).search(self.view)
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""JSON decoding for Solr admin responses.
+
+``loads`` uses orjson when it is installed and the standard library otherwise;
+``set_decoder`` swaps in any other ``bytes -> object`` callable.
+
+``select`` decodes only the parts of a document named by dotted paths, e.g.
+``status.*.instanceDir``, from a string, bytes or an iterable of byte chunks
+such as ``response.iter_content()``. The text is consumed chunk by chunk and
+dropped once scanned, so neither the raw body nor a full object tree of a big
+STATUS or schema payload is ever held at once. Values that fit in the buffered
+text (about ``CHUNK_SIZE``) are decoded or skipped by the C decoder and then
+filtered; only values spanning chunks are walked bracket by bracket. The result keeps the shape of the original
+document, restricted to the selected paths.
+"""
+
+import codecs
+import json
+import re
+from json.decoder import scanstring
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+_string = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_between = re.compile(r'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*', re.S)
+_scalar = re.compile(r'[^,\]}\s]+')
+_missing = object()
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _default_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+loads = _default_loads
+
+
+def set_decoder(decoder=None):
+    """Use ``decoder`` for all JSON responses; ``None`` restores the default."""
+    global loads
+    loads = decoder or _default_loads
+
+
+def _compile(paths):
+    trie = {}
+    for path in paths:
+        node = trie
+        segments = path.split('.')
+        for segment in segments[:-1]:
+            child = node.get(segment)
+            if child is True:
+                break
+            node = node.setdefault(segment, {})
+        else:
+            node[segments[-1]] = True
+    return trie
+
+
+def _merge(left, right):
+    if left is True or right is True:
+        return True
+    merged = dict(left)
+    for key, node in right.items():
+        merged[key] = _merge(merged[key], node) if key in merged else node
+    return merged
+
+
+def _child(trie, key):
+    node = trie.get(key)
+    wildcard = trie.get('*')
+    if node is None or wildcard is None:
+        return wildcard if node is None else node
+    return _merge(node, wildcard)
+
+
+class _Reader(object):
+    """JSON text pulled from ``chunks`` on demand; text before ``pos`` (or ``keep``) is dropped."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.keep = None
+        self.eof = False
+
+    def pull(self):
+        """Append the next chunk to the buffer; False once the input is exhausted."""
+        while not self.eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.eof = True
+                chunk = self._text.decode(b'', final=True)
+            elif isinstance(chunk, bytes):
+                chunk = self._text.decode(chunk)
+            if not chunk:
+                continue
+
+            start = self.pos if self.keep is None else min(self.keep, self.pos)
+            self.buffer = self.buffer[start:] + chunk
+            self.pos -= start
+            if self.keep is not None:
+                self.keep -= start
+            return True
+        return False
+
+    def char(self):
+        """The next non-whitespace character, pulling more text as needed."""
+        while True:
+            self.pos = _whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.pull():
+                raise ValueError('unexpected end of JSON input')
+
+    def string(self):
+        while _string.match(self.buffer, self.pos) is None:
+            if not self.pull():
+                raise ValueError('unterminated string at %d' % self.pos)
+        value, self.pos = scanstring(self.buffer, self.pos + 1)
+        return value
+
+    def _decode_buffered(self):
+        """Decode the value at ``pos`` if it lies entirely in the buffer, else return ``_missing``.
+
+        A number or literal running up to the end of the buffer may continue in
+        the next chunk (``1.`` + ``5``), so more text is pulled until it ends.
+        """
+        if self.buffer[self.pos] not in '"{[':
+            while _scalar.match(self.buffer, self.pos).end() == len(self.buffer) and self.pull():
+                pass
+        try:
+            value, end = _decoder.raw_decode(self.buffer, self.pos)
+        except ValueError:
+            return _missing
+        if end == len(self.buffer) and not self.eof:
+            return _missing
+        self.pos = end
+        return value
+
+    def _scan_value(self):
+        char = self.char()
+        if char == '"':
+            self.string()
+            return
+
+        if char not in '{[':
+            while True:
+                end = _scalar.match(self.buffer, self.pos).end()
+                if end < len(self.buffer) or not self.pull():
+                    self.pos = end
+                    return
+
+        depth = 0
+        while True:
+            buffer = self.buffer
+            end = len(buffer)
+            pos = self.pos
+            while True:
+                pos = _between.match(buffer, pos).end()
+                if pos >= end or buffer[pos] == '"':
+                    break
+                if buffer[pos] in '{[':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        self.pos = pos + 1
+                        return
+                pos += 1
+
+            self.pos = pos
+            if not self.pull():
+                raise ValueError('unterminated JSON value')
+
+    def skip_value(self):
+        self.char()
+        if self._decode_buffered() is _missing:
+            self._scan_value()
+
+    def value(self):
+        self.char()
+        value = self._decode_buffered()
+        if value is not _missing:
+            return value
+
+        self.keep = self.pos
+        try:
+            self._scan_value()
+            return json.loads(self.buffer[self.keep:self.pos])
+        finally:
+            self.keep = None
+
+
+def _project(value, trie):
+    if trie is True:
+        return value
+
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            node = _child(trie, key)
+            if node is not None:
+                item = _project(item, node)
+                if item is not _missing:
+                    result[key] = item
+        return result
+
+    if isinstance(value, list):
+        result = []
+        for index, item in enumerate(value):
+            node = _child(trie, str(index))
+            if node is not None:
+                item = _project(item, node)
+                if item is not _missing:
+                    result.append(item)
+        return result
+
+    return _missing
+
+
+def _select(reader, trie):
+    if trie is True:
+        return reader.value()
+
+    char = reader.char()
+    if char in '{[':
+        value = reader._decode_buffered()
+        if value is not _missing:
+            return _project(value, trie)
+    if char == '{':
+        result = {}
+        reader.pos += 1
+        if reader.char() == '}':
+            reader.pos += 1
+            return result
+        while True:
+            key = reader.string()
+            if reader.char() != ':':
+                raise ValueError('expected ":" at %d' % reader.pos)
+            reader.pos += 1
+
+            node = _child(trie, key)
+            if node is None:
+                reader.skip_value()
+            else:
+                value = _select(reader, node)
+                if value is not _missing:
+                    result[key] = value
+
+            char = reader.char()
+            if char == '}':
+                reader.pos += 1
+                return result
+            if char != ',':
+                raise ValueError('expected "," or "}" at %d' % reader.pos)
+            reader.pos += 1
+            reader.char()
+
+    if char == '[':
+        result = []
+        index = 0
+        reader.pos += 1
+        if reader.char() == ']':
+            reader.pos += 1
+            return result
+        while True:
+            node = _child(trie, str(index))
+            if node is None:
+                reader.skip_value()
+            else:
+                value = _select(reader, node)
+                if value is not _missing:
+                    result.append(value)
+
+            index += 1
+            char = reader.char()
+            if char == ']':
+                reader.pos += 1
+                return result
+            if char != ',':
+                raise ValueError('expected "," or "]" at %d' % reader.pos)
+            reader.pos += 1
+
+    reader.skip_value()
+    return _missing
+
+
+def _slices(data):
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start:start + CHUNK_SIZE]
+
+
+def select(data, paths):
+    """Decode only ``paths`` (dotted, ``*`` matches any key or list index) from ``data``.
+
+    ``data`` is a string, bytes or an iterable of byte chunks.
+    """
+    if isinstance(data, (bytes, str)):
+        data = _slices(data)
+
+    value = _select(_Reader(data), _compile(paths))
+    return {} if value is _missing else value
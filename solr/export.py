@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Helpers for streaming query results out of a core with ``QueryAPI``.
+
+``prefetched`` runs a page generator on a background thread, at most
+``depth`` pages ahead of the consumer, so the next page is fetched while the
+current one is processed. ``stream_docs`` pulls the documents of an
+``/export`` response out of its raw chunks as they arrive, without decoding
+the whole body at once.
+"""
+
+import codecs
+import json
+import threading
+from queue import Empty, Full, Queue
+
+from .resilience import SolrError
+
+_decoder = json.JSONDecoder()
+_done = object()
+
+
+def prefetched(pages, depth=1):
+    """Yield from the ``pages`` iterator while a background thread keeps ``depth`` pages ready."""
+    queue = Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for page in pages:
+                if not put(page):
+                    return
+            put(_done)
+        except Exception as error:
+            put(error)
+        finally:
+            close = getattr(pages, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name='solr-prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            try:
+                item = queue.get(timeout=0.1)
+            except Empty:
+                if not thread.is_alive() and queue.empty():
+                    return
+                continue
+            if item is _done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def stream_docs(chunks, batch_size=1000):
+    """Yield lists of at most ``batch_size`` documents from the raw chunks of an ``/export`` response."""
+    text = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    started = False
+    batch = []
+
+    for chunk in chunks:
+        buffer = buffer[pos:] + text.decode(chunk)
+        pos = 0
+
+        if not started:
+            key = buffer.find('"docs"')
+            bracket = buffer.find('[', key) if key >= 0 else -1
+            if bracket < 0:
+                continue
+            pos = bracket + 1
+            started = True
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                if batch:
+                    yield batch
+                return
+
+            try:
+                document, end = _decoder.raw_decode(buffer, pos)
+            except ValueError:
+                break
+            if 'EXCEPTION' in document:
+                raise SolrError('export failed: %s' % document['EXCEPTION'])
+
+            batch.append(document)
+            pos = end
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    raise SolrError('export response ended before its document list')
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""Apply the same schema and managed-resource changes to many cores at once.
+
+Operations are callables taking a ``CoreTarget``; the helpers below cover the
+common ``SchemaAdmin``, ``ManagedResources`` and ``SynonymResource`` calls::
+
+    fan = FanOut(base_uri, query="keys(@)[?starts_with(@, 'shop_')]", workers=8)
+    report = fan.run([modify_element('field', {'name': 'sku', 'type': 'string'}),
+                      append_synonyms('sku', ['tv', 'television'])], reload=True)
+
+Schema commands for one core are sent as a single ``SchemaAdmin.batch()``.
+A core fails, and is not reloaded, when a helper rejects its arguments or
+Solr answers any of its operations or its schema batch with an error.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import api
+
+
+def _required(result, message):
+    """Return ``result``; a helper that rejected its arguments returns None, which fails the core."""
+    if result is None:
+        raise ValueError(message)
+    return result
+
+
+def modify_element(element_type, element):
+    return lambda target: _required(target.schema.modify_element(element_type, element),
+                                    'invalid %s element: %r' % (element_type, element))
+
+
+def delete_element(element_type, element):
+    return lambda target: target.schema.delete_element(element_type, element)
+
+
+def create_resource(type_name, resource_name):
+    return lambda target: _required(target.resources.create_resource(type_name, resource_name),
+                                    'cannot create %s resource %s' % (type_name, resource_name))
+
+
+def delete_resource(type_name, resource_name):
+    return lambda target: target.resources.delete_resource(type_name, resource_name)
+
+
+def append_synonyms(resource_name, synonym_map):
+    return lambda target: target.synonyms(resource_name).append_synonyms(synonym_map)
+
+
+def sync_synonyms(resource_name, desired):
+    return lambda target: target.synonyms(resource_name).sync(desired)
+
+
+def sync_stopwords(resource_name, desired):
+    return lambda target: target.stopwords(resource_name).sync(desired)
+
+
+def _schema_errors(response):
+    """Error messages of a Schema API response, empty when the batch was accepted."""
+    messages = []
+    error = response.get('error')
+    if error:
+        messages.append(error.get('msg') if isinstance(error, dict) else str(error))
+    for error in response.get('errors') or []:
+        if isinstance(error, dict):
+            messages.extend(error.get('errorMessages') or [error.get('msg') or str(error)])
+        else:
+            messages.append(str(error))
+    return [message.strip() for message in messages if message]
+
+
+class CoreTarget(object):
+    """Lazily created endpoint objects for one core."""
+
+    def __init__(self, base_uri, core):
+        self.base_uri = base_uri
+        self.name = core
+        self._schema = None
+        self._resources = None
+        self._synonyms = {}
+        self._stopwords = {}
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            self._schema = api.SchemaAdmin(self.base_uri, self.name)
+        return self._schema
+
+    @property
+    def resources(self):
+        if self._resources is None:
+            self._resources = api.ManagedResources(self.base_uri, self.name)
+        return self._resources
+
+    def synonyms(self, name):
+        if name not in self._synonyms:
+            self._synonyms[name] = api.SynonymResource(self.base_uri, self.name, name)
+        return self._synonyms[name]
+
+    def stopwords(self, name):
+        if name not in self._stopwords:
+            self._stopwords[name] = api.StopwordResource(self.base_uri, self.name, name)
+        return self._stopwords[name]
+
+
+class FanOut(object):
+    """Runs operations across cores on a bounded pool of worker threads."""
+
+    def __init__(self, base_uri, cores=None, query=None, workers=8):
+        self.base_uri = base_uri
+        self.system = api.get_system(base_uri)
+        self._cores = cores
+        self.query = query
+        self.workers = workers
+
+    @property
+    def cores(self):
+        if self._cores is not None:
+            return list(self._cores)
+
+        if not self.query:
+            return sorted(self.system.cores)
+
+        found = self.system.search_cores(self.query) or []
+        if isinstance(found, dict):
+            found = list(found)
+        return [core['name'] if isinstance(core, dict) else core for core in found]
+
+    def _apply(self, core, operations):
+        started = time.time()
+        result = {'core': core, 'ok': True, 'error': None, 'results': []}
+        target = CoreTarget(self.base_uri, core)
+
+        try:
+            with target.schema.batch() as transaction:
+                for operation in operations:
+                    result['results'].append(operation(target))
+                errors = _schema_errors(transaction.commit())
+            if errors:
+                result['ok'] = False
+                result['error'] = 'schema batch rejected: %s' % '; '.join(errors)
+        except Exception as error:
+            result['ok'] = False
+            result['error'] = '%s: %s' % (type(error).__name__, error)
+
+        result['elapsed'] = time.time() - started
+        return result
+
+    def _reload(self, result):
+        started = time.time()
+        try:
+            response = self.system.reload_core(result['core'])
+            result['reloaded'] = 'error' not in response
+            if not result['reloaded']:
+                result['error'] = response['error'].get('msg')
+        except Exception as error:
+            result['reloaded'] = False
+            result['error'] = '%s: %s' % (type(error).__name__, error)
+        result['reload_elapsed'] = time.time() - started
+        return result
+
+    def run(self, operations, reload=False):
+        """Apply ``operations`` to every core and return a per-core report.
+
+        With ``reload`` set, cores whose operations succeeded are reloaded in a
+        second concurrent pass once all changes have been applied.
+        """
+        started = time.time()
+        cores = self.cores
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(lambda core: self._apply(core, operations), cores))
+
+            if reload:
+                applied = [result for result in results if result['ok']]
+                list(executor.map(self._reload, applied))
+
+        return {
+            'cores': results,
+            'failed': [result['core'] for result in results if not result['ok']],
+            'reload_failed': [result['core'] for result in results if result.get('reloaded') is False],
+            'elapsed': time.time() - started,
+            'slowest': max([result['elapsed'] for result in results] or [0.0])
+        }
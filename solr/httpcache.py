@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Validator-based HTTP response cache for ``_Endpoint`` GET requests.
+
+Responses carrying an ``ETag`` or ``Last-Modified`` header are stored with
+their body. Later GETs for the same URL and parameters send
+``If-None-Match``/``If-Modified-Since``; a ``304`` is answered from the
+stored body. Any other method sent through an endpoint drops the entries
+stored for it.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+def _related(endpoint, url):
+    return url == endpoint or url.startswith(endpoint + '/') or endpoint.startswith(url + '/')
+
+
+class ResponseCache(object):
+    """In-memory store of validated GET responses, grouped by endpoint URL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url, params=None):
+        if not params:
+            return url
+        return '%s?%s' % (url, urlencode(sorted((k, str(v)) for k, v in params.items())))
+
+    def get(self, endpoint, key):
+        with self._lock:
+            return self._entries.get(endpoint, {}).get(key)
+
+    def set(self, endpoint, key, entry):
+        with self._lock:
+            self._entries.setdefault(endpoint, {})[key] = entry
+
+    def invalidate(self, url):
+        """Drop entries of every endpoint on the path of ``url``."""
+        with self._lock:
+            for endpoint in [e for e in self._entries if _related(e, url)]:
+                del self._entries[endpoint]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def send(self, sessions, endpoint, method, url, **kwargs):
+        if method.lower() != 'get':
+            response = sessions.request(method=method, url=url, **kwargs)
+            self.invalidate(url)
+            return response
+
+        if kwargs.get('stream'):
+            return sessions.request(method=method, url=url, **kwargs)
+
+        key = self.key(url, kwargs.get('params'))
+        entry = self.get(endpoint, key)
+
+        if entry:
+            headers = dict(kwargs.get('headers') or {})
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+            kwargs['headers'] = headers
+
+        response = sessions.request(method=method, url=url, **kwargs)
+
+        if entry and response.status_code == requests.codes.not_modified:
+            self.hits += 1
+            return self._replay(entry, response)
+
+        self.misses += 1
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if response.status_code == requests.codes.ok and (etag or last_modified):
+            self.set(endpoint, key, {
+                'etag': etag,
+                'last_modified': last_modified,
+                'status': response.status_code,
+                'headers': dict(response.headers),
+                'content': response.content
+            })
+
+        return response
+
+    @staticmethod
+    def _replay(entry, not_modified):
+        response = requests.models.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['content']
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+
+class DiskResponseCache(ResponseCache):
+    """``ResponseCache`` persisted under ``directory``, so validators survive between runs."""
+
+    def __init__(self, directory):
+        ResponseCache.__init__(self)
+        self.directory = os.path.realpath(os.path.expanduser(directory))
+
+    @staticmethod
+    def _digest(value):
+        return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+    def _endpoint_dir(self, endpoint):
+        return os.path.join(self.directory, self._digest(endpoint))
+
+    def get(self, endpoint, key):
+        path = os.path.join(self._endpoint_dir(endpoint), self._digest(key))
+        try:
+            with open(path + '.json', mode='r') as meta_file:
+                entry = json.load(meta_file)
+            with open(path + '.body', mode='rb') as body_file:
+                entry['content'] = body_file.read()
+        except (IOError, OSError, ValueError):
+            return None
+        return entry
+
+    def set(self, endpoint, key, entry):
+        directory = self._endpoint_dir(endpoint)
+        with self._lock:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+                with open(os.path.join(directory, 'endpoint'), mode='w') as endpoint_file:
+                    endpoint_file.write(endpoint)
+
+        path = os.path.join(directory, self._digest(key))
+        meta = dict((k, v) for k, v in entry.items() if k != 'content')
+        for suffix, data, mode in (('.body', entry['content'], 'wb'), ('.json', json.dumps(meta), 'w')):
+            handle, tmp_path = tempfile.mkstemp(dir=directory)
+            with os.fdopen(handle, mode) as tmp_file:
+                tmp_file.write(data)
+            os.rename(tmp_path, path + suffix)
+
+    def invalidate(self, url):
+        if not os.path.isdir(self.directory):
+            return
+
+        with self._lock:
+            for name in os.listdir(self.directory):
+                directory = os.path.join(self.directory, name)
+                try:
+                    with open(os.path.join(directory, 'endpoint'), mode='r') as endpoint_file:
+                        endpoint = endpoint_file.read()
+                except (IOError, OSError):
+                    continue
+                if _related(endpoint, url):
+                    shutil.rmtree(directory, ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Streaming bulk indexing through the ``/update`` handler of a core.
+
+``DocumentIndexer`` serialises documents pulled from any iterable into JSON
+arrays bounded by ``max_bytes`` and ``max_docs`` and posts them from a pool of
+workers with ``commitWithin`` instead of per-batch commits. At most
+``queue_depth`` batches are waiting or in flight; the iterable is not read any
+further until one of them completes, so memory stays flat however many
+documents are sent.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps
+
+
+class DocumentIndexer(object):
+    """Posts documents to an ``UpdateAPI`` in bounded, concurrent batches."""
+
+    def __init__(self, update, max_bytes=1024 * 1024, max_docs=1000, workers=4, commit_within=10000,
+                 queue_depth=None):
+        self.update = update
+        self.max_bytes = max_bytes
+        self.max_docs = max_docs
+        self.workers = workers
+        self.commit_within = commit_within
+        self.queue_depth = queue_depth or workers * 2
+
+    def _send(self, body):
+        try:
+            response = self.update._post(body, commit_within=self.commit_within)
+        except Exception as error:
+            return str(error) or type(error).__name__
+
+        if 'error' in response:
+            return response['error'].get('msg', 'update failed')
+        return None
+
+    def run(self, documents):
+        started = time.time()
+        report = {'docs': 0, 'batches': 0, 'bytes': 0, 'failed_batches': 0, 'failed_docs': 0, 'errors': []}
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(self.queue_depth)
+
+        def record(batch, count, size, future):
+            try:
+                error = future.exception()
+                error = future.result() if error is None else str(error) or type(error).__name__
+                with lock:
+                    report['batches'] += 1
+                    report['bytes'] += size
+                    if error is None:
+                        report['docs'] += count
+                    else:
+                        report['failed_batches'] += 1
+                        report['failed_docs'] += count
+                        report['errors'].append({'batch': batch, 'docs': count, 'error': error})
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            def submit(batch, parts):
+                slots.acquire()
+                body = b'[' + b','.join(parts) + b']'
+                future = executor.submit(self._send, body)
+                future.add_done_callback(lambda f: record(batch, len(parts), len(body), f))
+
+            batch = 0
+            parts = []
+            size = 2
+            for document in documents:
+                encoded = dumps(document, separators=(',', ':')).encode('utf-8')
+                if parts and (size + len(encoded) > self.max_bytes or len(parts) >= self.max_docs):
+                    submit(batch, parts)
+                    batch += 1
+                    parts = []
+                    size = 2
+                parts.append(encoded)
+                size += len(encoded) + 1
+
+            if parts:
+                submit(batch, parts)
+
+        report['errors'].sort(key=lambda error: error['batch'])
+        report['elapsed'] = time.time() - started
+        report['docs_per_sec'] = report['docs'] / report['elapsed'] if report['elapsed'] else 0.0
+        return report
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Request instrumentation for the ``solr.api`` endpoints.
+
+Hooks registered here receive one event dict per HTTP request made through
+``_Endpoint._request`` (``kind`` is ``'request'``) and one per read of a
+``solr.cache.cached`` attribute (``kind`` is ``'cache'``). With no hook
+registered the endpoints skip all timing and bookkeeping.
+
+``enable()`` installs a process-wide ``RequestMetrics``; ``profile()`` records
+a single block::
+
+    with profile() as recorded:
+        provision_cores()
+    print(recorded.to_prometheus())
+"""
+
+import json
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+hooks = []
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def add_hook(hook):
+    hooks.append(hook)
+
+
+def remove_hook(hook):
+    if hook in hooks:
+        hooks.remove(hook)
+
+
+def emit(event):
+    for hook in list(hooks):
+        hook(event)
+
+
+def _labels(**labels):
+    return ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in sorted(labels.items()))
+
+
+class RequestMetrics(object):
+    """Per-endpoint latency histograms plus request, byte, status and cache counters."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._cache = {}
+
+    def __call__(self, event):
+        self.record(event)
+
+    def record(self, event):
+        with self._lock:
+            if event['kind'] == 'cache':
+                counters = self._cache.setdefault(event['attribute'], {'hit': 0, 'miss': 0})
+                counters['hit' if event['hit'] else 'miss'] += 1
+                return
+
+            key = (event['endpoint'], event['method'])
+            series = self._requests.get(key)
+            if series is None:
+                series = self._requests[key] = {
+                    'count': 0, 'errors': 0, 'bytes': 0, 'sum': 0.0, 'max': 0.0,
+                    'buckets': [0] * len(self.buckets), 'status': {}
+                }
+
+            elapsed = event['elapsed']
+            series['count'] += 1
+            series['bytes'] += event['bytes']
+            series['sum'] += elapsed
+            series['max'] = max(series['max'], elapsed)
+            index = bisect_left(self.buckets, elapsed)
+            if index < len(self.buckets):
+                series['buckets'][index] += 1
+
+            status = event['status']
+            if status is None or status >= 400:
+                series['errors'] += 1
+            status = str(status) if status is not None else 'error'
+            series['status'][status] = series['status'].get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+            self._cache.clear()
+
+    def snapshot(self):
+        """Return the collected series as plain, JSON serialisable data."""
+        with self._lock:
+            endpoints = []
+            for (endpoint, method), series in sorted(self._requests.items()):
+                cumulative = []
+                total = 0
+                for count in series['buckets']:
+                    total += count
+                    cumulative.append(total)
+                endpoints.append({
+                    'endpoint': endpoint,
+                    'method': method,
+                    'count': series['count'],
+                    'errors': series['errors'],
+                    'bytes': series['bytes'],
+                    'seconds_sum': series['sum'],
+                    'seconds_max': series['max'],
+                    'seconds_mean': series['sum'] / series['count'],
+                    'status': dict(series['status']),
+                    'buckets': dict(zip(self.buckets, cumulative))
+                })
+
+            cache = dict((attribute, dict(counters)) for attribute, counters in self._cache.items())
+
+        return {'requests': endpoints, 'cache': cache}
+
+    def to_json(self, **kwargs):
+        snapshot = self.snapshot()
+        for series in snapshot['requests']:
+            series['buckets'] = dict(('%g' % le, count) for le, count in series['buckets'].items())
+        return json.dumps(snapshot, **kwargs)
+
+    def to_prometheus(self, prefix='solr_api'):
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP %s_request_duration_seconds Latency of Solr API requests.' % prefix,
+            '# TYPE %s_request_duration_seconds histogram' % prefix
+        ]
+        for series in snapshot['requests']:
+            base = {'endpoint': series['endpoint'], 'method': series['method']}
+            for le, count in sorted(series['buckets'].items()):
+                lines.append('%s_request_duration_seconds_bucket{%s} %d' % (prefix, _labels(le='%g' % le, **base), count))
+            lines.append('%s_request_duration_seconds_bucket{%s} %d' % (prefix, _labels(le='+Inf', **base), series['count']))
+            lines.append('%s_request_duration_seconds_sum{%s} %f' % (prefix, _labels(**base), series['seconds_sum']))
+            lines.append('%s_request_duration_seconds_count{%s} %d' % (prefix, _labels(**base), series['count']))
+
+        lines += ['# HELP %s_responses_total Solr API responses by status.' % prefix,
+                  '# TYPE %s_responses_total counter' % prefix]
+        for series in snapshot['requests']:
+            for status, count in sorted(series['status'].items()):
+                labels = _labels(endpoint=series['endpoint'], method=series['method'], status=status)
+                lines.append('%s_responses_total{%s} %d' % (prefix, labels, count))
+
+        lines += ['# HELP %s_response_bytes_total Bytes received from Solr.' % prefix,
+                  '# TYPE %s_response_bytes_total counter' % prefix]
+        for series in snapshot['requests']:
+            labels = _labels(endpoint=series['endpoint'], method=series['method'])
+            lines.append('%s_response_bytes_total{%s} %d' % (prefix, labels, series['bytes']))
+
+        lines += ['# HELP %s_cache_total Cached attribute reads by result.' % prefix,
+                  '# TYPE %s_cache_total counter' % prefix]
+        for attribute, counters in sorted(snapshot['cache'].items()):
+            for result, count in sorted(counters.items()):
+                lines.append('%s_cache_total{%s} %d' % (prefix, _labels(attribute=attribute, result=result), count))
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = None
+
+
+def enable(buckets=DEFAULT_BUCKETS):
+    """Start collecting into the process-wide ``metrics`` recorder."""
+    global metrics
+    if metrics is None:
+        metrics = RequestMetrics(buckets=buckets)
+    if metrics not in hooks:
+        add_hook(metrics)
+    return metrics
+
+
+def disable():
+    if metrics is not None:
+        remove_hook(metrics)
+
+
+@contextmanager
+def profile(buckets=DEFAULT_BUCKETS):
+    """Record only the requests made inside the ``with`` block."""
+    recorder = RequestMetrics(buckets=buckets)
+    add_hook(recorder)
+    try:
+        yield recorder
+    finally:
+        remove_hook(recorder)
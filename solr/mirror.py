@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import posixpath
+import tempfile
+
+import requests
+
+
+class ConfigMirror(object):
+    """Local copy of a core's config directory, kept in sync through ``FileAdmin``.
+
+    Every mirrored file is recorded in an index with its listed size and
+    modification time, its SHA-1 and the ``Last-Modified`` header it was served
+    with. Files whose listing still matches the index are not downloaded again.
+    """
+
+    index_name = '.mirror-index.json'
+    chunk_size = 64 * 1024
+
+    def __init__(self, files, directory):
+        self.files = files
+        self.directory = os.path.realpath(os.path.expanduser(directory))
+        self.index = self._load_index()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, self.index_name)
+
+    def _load_index(self):
+        if not os.path.isfile(self.index_path):
+            return {}
+
+        with open(self.index_path, mode='r') as index_file:
+            try:
+                return json.load(index_file)
+            except ValueError:
+                return {}
+
+    def _save_index(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.index-')
+        with os.fdopen(handle, 'w') as index_file:
+            json.dump(self.index, index_file, indent=2, sort_keys=True)
+        os.rename(tmp_path, self.index_path)
+
+    def local_path(self, file_path):
+        """Path of ``file_path`` in the mirror; raises ``ValueError`` when it would resolve outside of it."""
+        local = os.path.realpath(os.path.join(self.directory, *file_path.strip('/').split('/')))
+        if local == self.directory or os.path.commonpath([self.directory, local]) != self.directory:
+            raise ValueError('%s resolves outside of the mirror directory %s' % (file_path, self.directory))
+        return local
+
+    def is_current(self, file_path, info):
+        entry = self.index.get(file_path)
+        if not entry:
+            return False
+
+        local = self.local_path(file_path)
+        if not os.path.isfile(local) or os.path.getsize(local) != entry['size']:
+            return False
+
+        return entry.get('listed_size') == info.get('size') and entry.get('modified') == info.get('modified')
+
+    def fetch(self, file_path, info=None):
+        """Download ``file_path`` in chunks unless the server reports it unchanged.
+
+        Returns the number of bytes written, 0 for a 304 response and None when
+        the file does not exist.
+        """
+        info = info or {}
+        local = self.local_path(file_path)
+        entry = self.index.get(file_path)
+
+        headers = {}
+        if entry and entry.get('last_modified') and os.path.isfile(local):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.files._request(method='get', params={'file': file_path}, headers=headers, stream=True)
+        try:
+            if response.status_code == requests.codes.not_modified:
+                entry.update(listed_size=info.get('size'), modified=info.get('modified'))
+                return 0
+
+            if response.status_code == requests.codes.not_found:
+                return None
+
+            response.raise_for_status()
+
+            parent = os.path.dirname(local)
+            if not os.path.isdir(parent):
+                os.makedirs(parent)
+
+            digest = hashlib.sha1()
+            size = 0
+            handle, tmp_path = tempfile.mkstemp(dir=parent, prefix='.fetch-')
+            with os.fdopen(handle, 'wb') as local_file:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    local_file.write(chunk)
+            os.rename(tmp_path, local)
+        finally:
+            response.close()
+
+        self.index[file_path] = {
+            'size': size,
+            'sha1': digest.hexdigest(),
+            'listed_size': info.get('size'),
+            'modified': info.get('modified'),
+            'last_modified': response.headers.get('last-modified')
+        }
+        return size
+
+    def sync(self, pattern=None, prune=True):
+        """Bring the mirror up to date and return a report of what changed.
+
+        Files no longer present on the server are removed locally when
+        ``prune`` is set and no ``pattern`` restricts the walk. Listed paths
+        that would resolve outside of the mirror directory are not fetched and
+        are reported as ``rejected``.
+        """
+        report = {'fetched': [], 'unchanged': [], 'removed': [], 'rejected': [], 'bytes': 0}
+        seen = set()
+
+        for file_path, info in self.files.walk(pattern=pattern, details=True):
+            seen.add(file_path)
+            try:
+                self.local_path(file_path)
+            except ValueError:
+                report['rejected'].append(file_path)
+                continue
+
+            if self.is_current(file_path, info):
+                report['unchanged'].append(file_path)
+                continue
+
+            written = self.fetch(file_path, info)
+            if written is None:
+                continue
+            report['fetched'].append(file_path)
+            report['bytes'] += written
+
+        if prune and not pattern:
+            for file_path in sorted(set(self.index) - seen):
+                try:
+                    local = self.local_path(file_path)
+                except ValueError:
+                    local = None
+                if local is not None and os.path.isfile(local):
+                    os.remove(local)
+                del self.index[file_path]
+                report['removed'].append(file_path)
+
+        self._save_index()
+        return report
+
+    def read(self, file_path):
+        """Return the content of ``file_path``, refreshing only that file if it changed."""
+        file_path = file_path.strip('/')
+        parent, name = posixpath.split(file_path)
+        info = dict(self.files._list_dir(parent)).get(name)
+        if info is None:
+            return None
+
+        if not self.is_current(file_path, info):
+            if self.fetch(file_path, info) is None:
+                return None
+            self._save_index()
+
+        with open(self.local_path(file_path), mode='rb') as local_file:
+            return local_file.read()
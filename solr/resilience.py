@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""Latency-aware request policy for ``_Endpoint``: adaptive timeouts, retries,
+hedged reads and a circuit breaker per Solr node.
+
+Failures surface as ``SolrError`` subclasses instead of ``None`` responses.
+Only requests marked idempotent (GETs by default) are retried or hedged.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from .session import base_key
+
+
+class SolrError(Exception):
+    pass
+
+
+class SolrUnavailable(SolrError):
+    """The node could not be reached, or its circuit breaker is open."""
+
+
+class SolrTimeout(SolrError):
+    """The node did not answer within the (adaptive) timeout."""
+
+
+class LatencyTracker(object):
+    """Recent latencies per key, for percentile estimates."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, elapsed):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(elapsed)
+
+    def percentile(self, key, fraction, min_samples=20):
+        with self._lock:
+            samples = self._samples.get(key)
+            if not samples or len(samples) < min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class CircuitBreaker(object):
+    """Opens after ``threshold`` consecutive failures; lets one trial through every ``reset_timeout``."""
+
+    def __init__(self, threshold=5, reset_timeout=30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.time() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.time()
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                opened = self.opened_at is None
+                self.opened_at = time.time()
+                return opened
+        return False
+
+
+class RequestPolicy(object):
+    """Wraps a ``SessionPool`` with timeouts, retries, hedging and circuit breaking.
+
+    The timeout of an idempotent request is ``timeout_factor`` times the
+    observed ``timeout_percentile`` latency of its ``key`` (endpoint and path,
+    without parameters), clamped to ``[min_timeout, max_timeout]``; until
+    enough samples exist, and for writes, the session default applies. Idempotent requests failing with a connection error, a
+    timeout or a 502/503/504 are retried up to ``retries`` times with jittered
+    exponential backoff. With ``hedge_percentile`` set, an idempotent request
+    still running after that latency percentile gets a duplicate and the first
+    answer wins. Hedged requests run on a pool of ``hedge_workers`` threads,
+    by default two per pooled connection of the session pool, so hedging does
+    not cap how many reads run at once.
+    """
+
+    retry_statuses = (502, 503, 504)
+
+    def __init__(self, retries=2, backoff=0.1, max_backoff=2.0, min_timeout=5.0, max_timeout=30.0,
+                 timeout_factor=4.0, timeout_percentile=0.99, hedge_percentile=None, hedge_workers=None,
+                 breaker_threshold=5, breaker_reset=30.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.timeout_percentile = timeout_percentile
+        self.hedge_percentile = hedge_percentile
+        self.hedge_workers = hedge_workers
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.latency = LatencyTracker()
+        self.counters = {'requests': 0, 'retries': 0, 'timeouts': 0, 'hedges': 0, 'hedge_wins': 0,
+                         'breaker_opened': 0, 'rejected': 0}
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._hedge_executor = None
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def breaker(self, url):
+        node = base_key(url)
+        with self._lock:
+            breaker = self._breakers.get(node)
+            if breaker is None:
+                breaker = self._breakers[node] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+            return breaker
+
+    def timeout_for(self, key):
+        observed = self.latency.percentile(key, self.timeout_percentile)
+        if observed is None:
+            return None
+        return min(max(observed * self.timeout_factor, self.min_timeout), self.max_timeout)
+
+    def _sleep(self, attempt):
+        delay = min(self.backoff * (2 ** attempt), self.max_backoff)
+        time.sleep(random.uniform(0, delay))
+
+    def _executor(self, sessions):
+        with self._lock:
+            if self._hedge_executor is None:
+                workers = self.hedge_workers or 2 * getattr(sessions, 'pool_size', 4)
+                self._hedge_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='solr-hedge')
+            return self._hedge_executor
+
+    def _hedged(self, sessions, method, url, key, kwargs):
+        delay = self.latency.percentile(key, self.hedge_percentile)
+        if delay is None:
+            return sessions.request(method=method, url=url, **kwargs)
+
+        executor = self._executor(sessions)
+        primary = executor.submit(sessions.request, method=method, url=url, **kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        self._count('hedges')
+        hedge = executor.submit(sessions.request, method=method, url=url, **kwargs)
+        done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        first = done.pop()
+        if first.exception() is not None and pending:
+            first = pending.pop()
+        for future in pending:
+            future.add_done_callback(lambda f: f.exception() is None and f.result().close())
+
+        if first is hedge:
+            self._count('hedge_wins')
+        return first.result()
+
+    def request(self, sessions, method, url, idempotent=None, key=None, **kwargs):
+        if idempotent is None:
+            idempotent = method.lower() in ('get', 'head')
+        key = key or url
+
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            self._count('rejected')
+            raise SolrUnavailable('circuit open for %s after %d failures' % (base_key(url), breaker.failures))
+
+        self._count('requests')
+        explicit_timeout = kwargs.pop('timeout', None)
+        hedge = idempotent and self.hedge_percentile and not kwargs.get('stream')
+        attempts = 1 + (self.retries if idempotent else 0)
+        error = None
+
+        for attempt in range(attempts):
+            if attempt:
+                self._count('retries')
+                self._sleep(attempt - 1)
+
+            kwargs['timeout'] = explicit_timeout or (self.timeout_for(key) if idempotent else None)
+            started = time.time()
+            try:
+                if hedge:
+                    response = self._hedged(sessions, method, url, key, kwargs)
+                else:
+                    response = sessions.request(method=method, url=url, **kwargs)
+            except requests.Timeout as timeout:
+                self._count('timeouts')
+                error = SolrTimeout('%s %s timed out after %ss: %s' % (method.upper(), url, kwargs['timeout'], timeout))
+            except requests.ConnectionError as connection_error:
+                error = SolrUnavailable('%s %s failed: %s' % (method.upper(), url, connection_error))
+            else:
+                if idempotent:
+                    self.latency.record(key, time.time() - started)
+                if response.status_code not in self.retry_statuses:
+                    breaker.success()
+                    return response
+                error = SolrUnavailable('%s %s answered %d' % (method.upper(), url, response.status_code))
+                if attempt == attempts - 1:
+                    breaker.failure()
+                    return response
+                response.close()
+
+            if breaker.failure():
+                self._count('breaker_opened')
+            if breaker.is_open:
+                break
+
+        raise error
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            counters['open_breakers'] = sorted(node for node, b in self._breakers.items() if b.is_open)
+        return counters
+
+
+class PolicyTransport(object):
+    """``SessionPool`` look-alike routing requests through a ``RequestPolicy``."""
+
+    def __init__(self, policy, sessions, idempotent=None, key=None):
+        self.policy = policy
+        self.sessions = sessions
+        self.idempotent = idempotent
+        self.key = key
+
+    def request(self, method, url, **kwargs):
+        return self.policy.request(self.sessions, method, url, idempotent=self.idempotent, key=self.key, **kwargs)
+
+
+policy = RequestPolicy()
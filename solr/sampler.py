@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Background sampling of index statistics for the cores of one node.
+
+``IndexSampler`` polls core STATUS with ``indexInfo=true`` every ``interval``
+seconds and keeps the last ``capacity`` samples of each core and metric in a
+``RingBuffer``: two preallocated ``array('d')`` of timestamps and values, so
+memory stays fixed however long the sampler runs. Cores that disappear from
+STATUS lose their buffers::
+
+    with IndexSampler(base_uri, interval=30) as sampler:
+        run_reindex()
+        print(sampler.report())
+"""
+
+import threading
+import time
+from array import array
+
+from . import api
+
+METRICS = ('numDocs', 'maxDoc', 'deletedDocs', 'segmentCount', 'sizeInBytes')
+
+
+class RingBuffer(object):
+    """Fixed-capacity series of ``(timestamp, value)`` floats, oldest first."""
+
+    __slots__ = ('capacity', 'times', 'values', 'start', 'size')
+
+    def __init__(self, capacity=360):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, value):
+        index = (self.start + self.size) % self.capacity
+        self.times[index] = timestamp
+        self.values[index] = value
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def _index(self, position):
+        return (self.start + position) % self.capacity
+
+    def samples(self):
+        return [(self.times[self._index(p)], self.values[self._index(p)]) for p in range(self.size)]
+
+    def last(self):
+        if not self.size:
+            return None
+        return self.values[self._index(self.size - 1)]
+
+    def rate(self, window=None):
+        """Change per second between the oldest sample within ``window`` seconds and the newest."""
+        if self.size < 2:
+            return None
+
+        last = self._index(self.size - 1)
+        first = 0
+        if window is not None:
+            while first < self.size - 1 and self.times[last] - self.times[self._index(first)] > window:
+                first += 1
+
+        first = self._index(first)
+        elapsed = self.times[last] - self.times[first]
+        if elapsed <= 0:
+            return None
+        return (self.values[last] - self.values[first]) / elapsed
+
+    def rates(self):
+        """Per-interval rates between consecutive samples."""
+        rates = []
+        for position in range(1, self.size):
+            previous, current = self._index(position - 1), self._index(position)
+            elapsed = self.times[current] - self.times[previous]
+            if elapsed > 0:
+                rates.append((self.values[current] - self.values[previous]) / elapsed)
+        return rates
+
+    def percentile(self, fraction, rates=False):
+        """Percentile of the stored values, or of the per-interval rates with ``rates=True``."""
+        ordered = sorted(self.rates() if rates else [self.values[self._index(p)] for p in range(self.size)])
+        if not ordered:
+            return None
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class IndexSampler(object):
+    """Opt-in poller filling one ``RingBuffer`` per core and metric."""
+
+    def __init__(self, base_uri, interval=60.0, capacity=360, cores=None, metrics=METRICS):
+        self.system = api.get_system(base_uri)
+        self.interval = interval
+        self.capacity = capacity
+        self.cores = set(cores) if cores else None
+        self.metrics = tuple(metrics)
+        self.errors = 0
+        self.last_error = None
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """Take one sample of every core now."""
+        status = self.system.core_status(['index.%s' % metric for metric in self.metrics], index_info=True)
+        now = time.time()
+
+        with self._lock:
+            for core in [c for c in self._buffers if c not in status]:
+                del self._buffers[core]
+
+            for core, core_status in status.items():
+                if self.cores is not None and core not in self.cores:
+                    continue
+                index = core_status.get('index', {})
+                buffers = self._buffers.setdefault(core, {})
+                for metric in self.metrics:
+                    if metric not in index:
+                        continue
+                    buffer = buffers.get(metric)
+                    if buffer is None:
+                        buffer = buffers[metric] = RingBuffer(self.capacity)
+                    buffer.append(now, float(index[metric]))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as error:
+                self.errors += 1
+                self.last_error = '%s: %s' % (type(error).__name__, error)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='solr-index-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def series(self, core, metric='numDocs'):
+        with self._lock:
+            buffer = self._buffers.get(core, {}).get(metric)
+            return buffer.samples() if buffer is not None else []
+
+    def rate(self, core, metric='numDocs', window=None):
+        with self._lock:
+            buffer = self._buffers.get(core, {}).get(metric)
+            return buffer.rate(window) if buffer is not None else None
+
+    def percentile(self, core, metric, fraction, rates=False):
+        with self._lock:
+            buffer = self._buffers.get(core, {}).get(metric)
+            return buffer.percentile(fraction, rates=rates) if buffer is not None else None
+
+    def report(self, window=None):
+        """Latest size and document count per core with their growth per second."""
+        report = {}
+        with self._lock:
+            for core, buffers in sorted(self._buffers.items()):
+                docs = buffers.get('numDocs')
+                size = buffers.get('sizeInBytes')
+                report[core] = {
+                    'docs': docs.last() if docs else None,
+                    'docs_per_sec': docs.rate(window) if docs else None,
+                    'docs_per_sec_p95': docs.percentile(0.95, rates=True) if docs else None,
+                    'size_bytes': size.last() if size else None,
+                    'size_bytes_per_sec': size.rate(window) if size else None,
+                    'samples': len(docs) if docs else 0
+                }
+        return report
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from urllib.parse import urlsplit
+
+
+def base_key(uri):
+    """Return the ``scheme://host:port`` part of ``uri``, used to key sessions per Solr node."""
+    parts = urlsplit(uri)
+    return '%s://%s' % (parts.scheme, parts.netloc)
+
+
+class SessionPool(object):
+    """Keep-alive ``requests`` sessions shared per Solr node.
+
+    Every endpoint talking to the same node goes through the same session, so a
+    whole run reuses a handful of warm connections instead of opening one per call.
+    """
+
+    def __init__(self, pool_size=4, keep_alive=True, timeout=30, max_retries=0, block=False):
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.block = block
+        self._sessions = {}
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def configure(self, **options):
+        """Change pool options; open sessions are closed and rebuilt lazily with the new settings."""
+        for name, value in options.items():
+            if not hasattr(self, name) or name.startswith('_'):
+                raise TypeError('unknown session option: %s' % name)
+            setattr(self, name, value)
+        self.close()
+
+    def _make_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                              max_retries=self.max_retries, pool_block=self.block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def _session(self, key):
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = self._make_session()
+            self._requests.setdefault(key, 0)
+        return session
+
+    def session(self, uri):
+        with self._lock:
+            return self._session(base_key(uri))
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+
+        key = base_key(url)
+        with self._lock:
+            session = self._session(key)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+        return session.request(method=method, url=url, **kwargs)
+
+    @staticmethod
+    def _connections(session):
+        opened = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    opened += pool.num_connections
+        return opened
+
+    def stats(self, uri=None):
+        """Return request and connection counters, per node or for the node of ``uri``."""
+        with self._lock:
+            keys = [base_key(uri)] if uri else list(self._requests)
+            result = {}
+            for key in keys:
+                total = self._requests.get(key, 0)
+                session = self._sessions.get(key)
+                opened = self._connections(session) if session is not None else 0
+                result[key] = {
+                    'requests': total,
+                    'connections': opened,
+                    'reused': max(total - opened, 0)
+                }
+
+        if uri:
+            return result[base_key(uri)]
+        return result
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._requests.clear()
+
+
+sessions = SessionPool()
+
+
+def configure_sessions(**options):
+    sessions.configure(**options)
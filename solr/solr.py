@@ -25,18 +25,18 @@ def main():
 
     schema_factory = config_tree.xpath('/config/schemaFactory')[0]
 
-    print etree.tostring(schema_factory)
+    print(etree.tostring(schema_factory, encoding='unicode'))
 
     etree.SubElement(schema_factory, 'bool', attrib={'name': 'mutable'}).text = 'true'
     etree.SubElement(schema_factory, 'str', attrib={'name': 'managedSchemaResourceName'}).text = 'managed-schema'
 
     schema_factory.set('class', 'ManagedIndexSchemaFactory')
-    print etree.tostring(schema_factory)
+    print(etree.tostring(schema_factory, encoding='unicode'))
 
-    # print jmespath.search("fieldTypes[].analyzer.filters[?class==`solr.SynonymFilterFactory`][].{file: synonyms}", api.schema)
-    # print jmespath.search("fieldTypes[?analyzer].{name: name, file: analyzer.filters[?class==`solr.SynonymFilterFactory`][].synonyms | [0]}", api.schema)
+    # print(jmespath.search("fieldTypes[].analyzer.filters[?class==`solr.SynonymFilterFactory`][].{file: synonyms}", api.schema))
+    # print(jmespath.search("fieldTypes[?analyzer].{name: name, file: analyzer.filters[?class==`solr.SynonymFilterFactory`][].synonyms | [0]}", api.schema))
 
-    # print api.schema
+    # print(api.schema)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,551 @@
+# -*- coding: utf-8 -*-
+"""Minimal asyncio stand-in for the parts of the Solr HTTP API used by ``solr.api``.
+
+Run it inside an event loop (``await StubSolr().start()``) or in a background
+thread (``StubSolr().start_in_thread()``) and point any client at ``stub.base_uri``.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+from urllib.parse import parse_qs, urlsplit, unquote
+
+
+SYNONYMS_CLASS = 'org.apache.solr.rest.schema.analysis.ManagedSynonymFilterFactory$SynonymManager'
+STOPWORDS_CLASS = 'org.apache.solr.rest.schema.analysis.ManagedWordSetResource'
+
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 500: 'Server Error'}
+
+_SCHEMA_LISTS = {
+    'field': 'fields',
+    'field-type': 'fieldTypes',
+    'copy-field': 'copyFields',
+    'dynamic-field': 'dynamicFields'
+}
+
+
+class _Pairs(dict):
+    """JSON object that also remembers repeated keys, as sent in Schema API batches."""
+
+    def __init__(self, pairs):
+        dict.__init__(self, pairs)
+        self.pairs = pairs
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+class Response(object):
+    def __init__(self, status=200, body=b'', content_type='application/json', headers=None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    @classmethod
+    def json(cls, payload, status=200):
+        return cls(status=status, body=json.dumps(payload).encode('utf-8'))
+
+    @classmethod
+    def not_found(cls, message='not found'):
+        return cls.json({'error': {'msg': message, 'code': 404}}, status=404)
+
+
+class StubCore(object):
+    def __init__(self, name, config='solrconfig.xml', schema='schema.xml'):
+        self.name = name
+        self.config = config
+        self.schema_file = schema
+        self.schema = {
+            'name': name,
+            'version': 1.6,
+            'uniqueKey': 'id',
+            'fields': [{'name': 'id', 'type': 'string', 'stored': True}],
+            'fieldTypes': [{'name': 'string', 'class': 'solr.StrField'}],
+            'copyFields': [],
+            'dynamicFields': []
+        }
+        self.managed = {}
+        self.documents = {}
+        self.index_version = 0
+        self.overlay = {'znodeVersion': 0}
+        self.config_doc = {
+            'luceneMatchVersion': '6.6.2',
+            'updateHandler': {'class': 'solr.DirectUpdateHandler2', 'autoCommit': {'maxTime': 15000}},
+            'requestHandler': {
+                '/select': {'name': '/select', 'class': 'solr.SearchHandler', 'defaults': {'rows': 10}},
+                '/update': {'name': '/update', 'class': 'solr.UpdateRequestHandler'}
+            }
+        }
+        self.files = {
+            config: b'<?xml version="1.0"?>\n<config><schemaFactory class="ClassicIndexSchemaFactory"/></config>\n',
+            schema: b'<?xml version="1.0"?>\n<schema name="%s" version="1.6"/>\n' % name.encode('utf-8')
+        }
+
+    def index_info(self):
+        size = sum(len(json.dumps(document)) for document in self.documents.values())
+        return {
+            'numDocs': len(self.documents),
+            'maxDoc': len(self.documents),
+            'deletedDocs': 0,
+            'version': self.index_version,
+            'segmentCount': 1 if self.documents else 0,
+            'current': True,
+            'hasDeletions': False,
+            'sizeInBytes': size,
+            'size': '%d bytes' % size
+        }
+
+    def status(self, home):
+        return {
+            'name': self.name,
+            'instanceDir': '%s/%s' % (home, self.name),
+            'dataDir': '%s/%s/data/' % (home, self.name),
+            'config': self.config,
+            'schema': self.schema_file,
+            'startTime': '2017-10-27T00:00:00Z',
+            'uptime': 1000
+        }
+
+
+class StubSolr(object):
+    """In-memory Solr node speaking just enough HTTP/1.1 for the ``solr.api`` clients."""
+
+    def __init__(self, host='127.0.0.1', port=0, prefix='/solr', home='/var/solr/data', latency=0.0):
+        self.host = host
+        self.latency = latency
+        self.port = port
+        self.prefix = prefix.rstrip('/')
+        self.home = home
+        self.cores = {}
+        self.live_nodes = None
+        self.requests = []
+        self._server = None
+        self._connections = set()
+        self._loop = None
+        self._thread = None
+
+    @property
+    def base_uri(self):
+        return 'http://%s:%d%s' % (self.host, self.port, self.prefix)
+
+    def add_core(self, name, **kwargs):
+        core = self.cores[name] = StubCore(name, **kwargs)
+        return core
+
+    def populate(self, cores=1, fields=0, dynamic_fields=0, synonyms=0, tree_depth=0, tree_width=0, files_per_dir=0):
+        """Fill the node with generated cores shaped like a real deployment.
+
+        Every core gets ``fields`` fields and ``dynamic_fields`` dynamic fields, a
+        ``synonyms`` resource with that many mappings, and a config tree
+        ``tree_depth`` directories deep and ``tree_width`` wide with
+        ``files_per_dir`` files in each directory.
+        """
+        for c in range(cores):
+            core = self.add_core('core_%04d' % c)
+            core.schema['fieldTypes'].append({'name': 'text_general', 'class': 'solr.TextField'})
+            core.schema['fields'] += [{'name': 'field_%05d' % f, 'type': 'text_general', 'indexed': True,
+                                       'stored': f % 2 == 0, 'multiValued': f % 3 == 0} for f in range(fields)]
+            core.schema['dynamicFields'] += [{'name': '*_d%04d' % f, 'type': 'string', 'stored': True}
+                                             for f in range(dynamic_fields)]
+            if synonyms:
+                core.managed['/schema/analysis/synonyms/synonyms'] = {
+                    'class': SYNONYMS_CLASS,
+                    'initArgs': {'ignoreCase': False},
+                    'data': dict(('term_%06d' % k, ['term_%06d' % k, 'alt_%06d' % k]) for k in range(synonyms))
+                }
+
+            directories = ['']
+            level = ['']
+            for depth in range(tree_depth):
+                level = ['%sd%d_%d/' % (parent, depth, w) for parent in level for w in range(tree_width)]
+                directories += level
+            for directory in directories[1:] if files_per_dir else []:
+                for f in range(files_per_dir):
+                    core.files['%sfile_%d.txt' % (directory, f)] = b'word\n' * 64
+
+        return self
+
+    # -- server lifecycle ------------------------------------------------
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def start_in_thread(self):
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='stub-solr')
+        self._thread.daemon = True
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop_thread(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    async def _serve(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = line.decode('latin-1').split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+
+                response = await self.respond(method.upper(), target, headers, body)
+
+                head = ['HTTP/1.1 %d %s' % (response.status, _REASONS.get(response.status, 'Unknown')),
+                        'Content-Type: %s' % response.content_type,
+                        'Content-Length: %d' % len(response.body)]
+                head += ['%s: %s' % item for item in response.headers.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + response.body)
+                await writer.drain()
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def respond(self, method, target, headers, body):
+        """Build the response for one request; subclasses may wrap this to add behaviour."""
+        started = time.time()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        parts = urlsplit(target)
+        query = dict((k, v[-1]) for k, v in parse_qs(parts.query).items())
+        path = unquote(parts.path)
+        payload = None
+        if body:
+            try:
+                payload = json.loads(body.decode('utf-8'), object_pairs_hook=_Pairs)
+            except ValueError:
+                return Response.json({'error': {'msg': 'invalid json', 'code': 400}}, status=400)
+
+        response = self.dispatch(method, path, query, payload)
+        if method == 'GET' and response.status == 200:
+            etag = '"%s"' % hashlib.sha1(response.body).hexdigest()
+            if headers.get('if-none-match') == etag:
+                response = Response(status=304, content_type=response.content_type)
+            response.headers['ETag'] = etag
+        self.requests.append((method, path, response.status, len(response.body), time.time() - started))
+        return response
+
+    # -- routing ---------------------------------------------------------
+
+    def dispatch(self, method, path, query, payload):
+        if not path.startswith(self.prefix + '/'):
+            return Response.not_found()
+
+        segments = [s for s in path[len(self.prefix):].split('/') if s]
+        if segments[:1] == ['admin']:
+            return self._admin(segments[1:], query)
+
+        core = self.cores.get(segments[0])
+        if core is None:
+            return Response.not_found('no such core: %s' % segments[0])
+
+        rest = segments[1:]
+        if rest == ['schema'] and query.get('wt') == 'schema.xml':
+            return Response(body=core.files.get(core.schema_file, b''), content_type='application/xml')
+        if rest == ['schema']:
+            return self._schema(core, method, payload)
+        if rest == ['schema', 'managed']:
+            return Response.json({'managedResources': self._managed_list(core)})
+        if rest == ['config', 'overlay']:
+            return Response.json({'overlay': core.overlay})
+        if rest == ['config']:
+            return self._config(core, method, payload)
+        if rest[:2] == ['schema', 'analysis'] and len(rest) >= 4:
+            return self._resource(core, method, '/' + '/'.join(rest[:4]), rest[4:], payload)
+        if rest == ['admin', 'file']:
+            return self._file(core, query.get('file', ''))
+        if rest == ['update'] and method == 'POST':
+            return self._update(core, payload)
+        if rest == ['select']:
+            return self._select(core, query)
+        if rest == ['export']:
+            return self._export(core, query)
+
+        return Response.not_found()
+
+    def _admin(self, segments, query):
+        if segments == ['info', 'system']:
+            return Response.json({
+                'mode': 'std' if self.live_nodes is None else 'solrcloud',
+                'solr_home': self.home,
+                'lucene': {'solr-spec-version': '6.6.2', 'lucene-spec-version': '6.6.2'},
+                'jvm': {'version': '1.8.0'},
+                'system': {'name': 'Linux'}
+            })
+
+        if segments == ['collections'] and self.live_nodes is not None:
+            return Response.json({'cluster': {'live_nodes': list(self.live_nodes), 'collections': {}}})
+
+        if segments != ['cores']:
+            return Response.not_found()
+
+        action = query.get('action', 'STATUS').upper()
+        if action == 'STATUS':
+            cores = self.cores
+            if 'core' in query:
+                cores = dict((k, v) for k, v in cores.items() if k == query['core'])
+            status = dict((n, c.status(self.home)) for n, c in cores.items())
+            if query.get('indexInfo') == 'true':
+                for name, core in cores.items():
+                    status[name]['index'] = core.index_info()
+            return Response.json({'status': status})
+        if action == 'CREATE':
+            name = query.get('name')
+            if name in self.cores:
+                return Response.json({'error': {'msg': 'Core with name %s already exists' % name, 'code': 500}}, 500)
+            options = dict((k, query[k]) for k in ('config', 'schema') if k in query)
+            self.add_core(name, **options)
+            return Response.json({'core': name})
+        if action == 'RELOAD':
+            if query.get('core') not in self.cores:
+                return Response.json({'error': {'msg': 'No such core', 'code': 400}}, 400)
+            return Response.json({'responseHeader': {'status': 0}})
+        if action == 'UNLOAD':
+            self.cores.pop(query.get('core'), None)
+            return Response.json({'responseHeader': {'status': 0}})
+
+        return Response.json({'error': {'msg': 'Unsupported action', 'code': 400}}, 400)
+
+    def _schema(self, core, method, payload):
+        if method == 'GET':
+            return Response.json({'schema': core.schema})
+
+        for command, values in getattr(payload, 'pairs', []):
+            action, _, element_type = command.partition('-')
+            elements = core.schema.get(_SCHEMA_LISTS.get(element_type), None)
+            if elements is None:
+                return Response.json({'errors': [{'errorMessages': ['unknown command %s' % command]}]}, 400)
+
+            for value in _as_list(values):
+                if element_type == 'copy-field':
+                    match = [e for e in elements if e['source'] == value['source'] and e['dest'] == value['dest']]
+                else:
+                    name = value['name'] if isinstance(value, dict) else value
+                    match = [e for e in elements if e['name'] == name]
+
+                if action == 'delete':
+                    for e in match:
+                        elements.remove(e)
+                elif action == 'replace' and match:
+                    elements[elements.index(match[0])] = value
+                else:
+                    elements.append(value)
+
+        return Response.json({'responseHeader': {'status': 0}})
+
+    def _update(self, core, payload):
+        if isinstance(payload, list):
+            commands = [('add', {'doc': document}) for document in payload]
+        else:
+            commands = getattr(payload, 'pairs', [])
+
+        for command, value in commands:
+            if command == 'add':
+                document = value['doc']
+                if 'id' not in document:
+                    return Response.json({'error': {'msg': 'Document is missing mandatory uniqueKey field: id',
+                                                    'code': 400}}, 400)
+                core.documents[str(document['id'])] = document
+            elif command == 'delete':
+                if isinstance(value, dict) and value.get('query') == '*:*':
+                    core.documents.clear()
+                for doc_id in _as_list(value.get('id', []) if isinstance(value, dict) else value):
+                    core.documents.pop(str(doc_id), None)
+
+        core.index_version += 1
+        return Response.json({'responseHeader': {'status': 0, 'QTime': 0}})
+
+    @staticmethod
+    def _fields(document, fl):
+        if not fl or fl == '*':
+            return document
+        fields = fl.split(',')
+        return dict((k, v) for k, v in document.items() if k in fields)
+
+    def _select(self, core, query):
+        ids = sorted(core.documents)
+        rows = int(query.get('rows', 10))
+        cursor = query.get('cursorMark')
+        if cursor is None:
+            start = int(query.get('start', 0))
+            page = ids[start:start + rows]
+        else:
+            page = [i for i in ids if cursor == '*' or i > cursor][:rows]
+
+        payload = {
+            'responseHeader': {'status': 0, 'QTime': 0},
+            'response': {'numFound': len(ids), 'start': 0,
+                         'docs': [self._fields(core.documents[i], query.get('fl')) for i in page]}
+        }
+        if cursor is not None:
+            payload['nextCursorMark'] = page[-1] if page else cursor
+        return Response.json(payload)
+
+    def _export(self, core, query):
+        if not query.get('sort') or not query.get('fl'):
+            return Response.json({'responseHeader': {'status': 400},
+                                  'response': {'numFound': 0, 'docs': [{'EXCEPTION': 'sort and fl are required'}]}})
+        docs = [self._fields(core.documents[i], query['fl']) for i in sorted(core.documents)]
+        return Response.json({'responseHeader': {'status': 0}, 'response': {'numFound': len(docs), 'docs': docs}})
+
+    def _config(self, core, method, payload):
+        if method == 'GET':
+            config = dict(core.config_doc)
+            for kind, components in core.overlay.items():
+                if isinstance(components, dict) and kind not in ('props', 'userProps'):
+                    config[kind] = dict(config.get(kind, {}), **components)
+            return Response.json({'config': config})
+
+        kinds = {'requesthandler': 'requestHandler', 'searchcomponent': 'searchComponent',
+                 'initparams': 'initParams', 'queryresponsewriter': 'queryResponseWriter'}
+        for command, value in getattr(payload, 'pairs', []):
+            action, _, kind = command.partition('-')
+            if kind in ('property', 'user-property'):
+                props = core.overlay.setdefault('props' if kind == 'property' else 'userProps', {})
+                if action == 'set':
+                    props.update(value)
+                else:
+                    props.pop(value, None)
+            elif kind in kinds:
+                components = core.overlay.setdefault(kinds[kind], {})
+                if action == 'delete':
+                    components.pop(value, None)
+                    core.config_doc.get(kinds[kind], {}).pop(value, None)
+                else:
+                    components[value['name']] = value
+            else:
+                return Response.json({'errorMessages': ['unknown command %s' % command]}, 400)
+
+        core.overlay['znodeVersion'] += 1
+        return Response.json({'responseHeader': {'status': 0}})
+
+    @staticmethod
+    def _managed_list(core):
+        return [{'resourceId': rid, 'class': res['class'], 'numObservers': '0'} for rid, res in core.managed.items()]
+
+    def _resource(self, core, method, resource_id, rest, payload):
+        resource = core.managed.get(resource_id)
+
+        if method == 'PUT' and resource is None:
+            kind = resource_id.split('/')[3]
+            cls = (payload or {}).get('class', SYNONYMS_CLASS if kind == 'synonyms' else STOPWORDS_CLASS)
+            core.managed[resource_id] = {'class': cls, 'initArgs': {'ignoreCase': False}, 'data': {} if kind == 'synonyms' else []}
+            return Response.json({'responseHeader': {'status': 0}})
+
+        if resource is None:
+            return Response.not_found('%s not found' % resource_id)
+
+        synonyms = isinstance(resource['data'], dict)
+        data = resource['data']
+
+        if method == 'GET':
+            if rest:
+                key = rest[0]
+                if key not in data:
+                    return Response.not_found('%s not found' % key)
+                return Response.json({key: data[key] if synonyms else key})
+            managed = {'initArgs': resource['initArgs'], 'initializedOn': '2017-10-27T00:00:00Z'}
+            if synonyms:
+                managed['managedMap'] = data
+                return Response.json({'synonymMappings': managed})
+            managed['managedList'] = sorted(data)
+            return Response.json({'wordSet': managed})
+
+        if method == 'DELETE':
+            if not rest:
+                del core.managed[resource_id]
+                return Response.json({'responseHeader': {'status': 0}})
+            if rest[0] not in data:
+                return Response.not_found('%s not found' % rest[0])
+            if synonyms:
+                del data[rest[0]]
+            else:
+                data.remove(rest[0])
+            return Response.json({'responseHeader': {'status': 0}})
+
+        if method == 'POST' and isinstance(payload, dict) and 'initArgs' in payload:
+            resource['initArgs'] = payload['initArgs']
+            return Response.json({'responseHeader': {'status': 0}})
+
+        if method == 'PUT':
+            if not synonyms:
+                data.extend(w for w in _as_list(payload) if w not in data)
+            elif isinstance(payload, list):
+                for word in payload:
+                    merged = data.setdefault(word, [])
+                    merged.extend(w for w in payload if w not in merged)
+            else:
+                for key, values in payload.items():
+                    merged = data.setdefault(key, [])
+                    merged.extend(w for w in _as_list(values) if w not in merged)
+            return Response.json({'responseHeader': {'status': 0}})
+
+        return Response.json({'error': {'msg': 'unsupported', 'code': 400}}, 400)
+
+    def _file(self, core, file_path):
+        file_path = file_path.strip('/')
+        if file_path in core.files:
+            content_type = 'application/xml' if file_path.endswith('.xml') else 'text/plain'
+            return Response(body=core.files[file_path], content_type=content_type)
+
+        prefix = file_path + '/' if file_path else ''
+        listing = {}
+        for name, content in core.files.items():
+            if not name.startswith(prefix):
+                continue
+            head, sep, _ = name[len(prefix):].partition('/')
+            if sep:
+                listing[head] = {'directory': True, 'modified': '2017-10-27T00:00:00Z'}
+            else:
+                listing[head] = {'size': len(content), 'modified': '2017-10-27T00:00:00Z'}
+
+        if not listing:
+            return Response.not_found('Can not find: %s' % file_path)
+
+        return Response.json({'files': listing})
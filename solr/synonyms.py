@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Streaming import of Solr-format synonym files into a managed synonym resource."""
+
+import time
+from json import dumps
+
+
+def _split(text, line_number):
+    terms = []
+    term = []
+    chars = iter(text)
+    for char in chars:
+        if char == '\\':
+            escaped = next(chars, None)
+            if escaped is None:
+                raise ValueError('line %d: trailing escape character' % line_number)
+            term.append(escaped)
+        elif char == ',':
+            terms.append(''.join(term).strip())
+            term = []
+        else:
+            term.append(char)
+    terms.append(''.join(term).strip())
+
+    return [t for t in terms if t]
+
+
+def parse_synonyms(lines, ignore_case=False):
+    """Yield ``(sources, targets)`` for every rule in Solr synonyms.txt syntax.
+
+    ``a, b, c`` yields the same list for both sides, ``a, b => c`` maps each
+    source onto the targets. Comments and blank lines are skipped.
+    """
+    for line_number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if ignore_case:
+            line = line.lower()
+
+        sides = line.split('=>')
+        if len(sides) > 2:
+            raise ValueError('line %d: more than one "=>" in %r' % (line_number, line))
+
+        sources = _split(sides[0], line_number)
+        targets = _split(sides[1], line_number) if len(sides) == 2 else sources
+        if sources and targets:
+            yield sources, targets
+
+
+class SynonymImporter(object):
+    """Sends only the mappings missing from a ``SynonymResource`` in bounded PUTs."""
+
+    def __init__(self, resource, max_bytes=512 * 1024, max_entries=5000):
+        self.resource = resource
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+    def _flush(self, pending, report):
+        if not pending:
+            return
+
+        body = dumps(pending)
+        response = self.resource._json_request(method='put', data=body.encode('utf-8'),
+                                               headers={'Content-Type': 'application/json'})
+        report['requests'] += 1
+        report['bytes'] += len(body)
+        if 'error' in response:
+            report['failed_chunks'] += 1
+        else:
+            report['sent'] += sum(len(targets) for targets in pending.values())
+
+    def run(self, lines):
+        started = time.time()
+        ignore_case = bool(self.resource.init_args.get('ignoreCase'))
+        known = dict((key, set(values)) for key, values in self.resource.map_index.items())
+        report = {'rules': 0, 'mappings': 0, 'sent': 0, 'skipped': 0,
+                  'requests': 0, 'bytes': 0, 'failed_chunks': 0}
+
+        pending = {}
+        pending_bytes = 2
+        for sources, targets in parse_synonyms(lines, ignore_case=ignore_case):
+            report['rules'] += 1
+            for key in sources:
+                existing = known.setdefault(key, set())
+                for target in targets:
+                    report['mappings'] += 1
+                    if target in existing:
+                        report['skipped'] += 1
+                        continue
+                    existing.add(target)
+                    if key not in pending:
+                        pending[key] = []
+                        pending_bytes += len(dumps(key)) + 4
+                    pending[key].append(target)
+                    pending_bytes += len(dumps(target)) + 2
+
+            if pending_bytes >= self.max_bytes or len(pending) >= self.max_entries:
+                self._flush(pending, report)
+                pending = {}
+                pending_bytes = 2
+
+        self._flush(pending, report)
+        if report['requests']:
+            self.resource._invalidate_synonyms()
+
+        report['elapsed'] = time.time() - started
+        report['mappings_per_sec'] = report['mappings'] / report['elapsed'] if report['elapsed'] else 0.0
+        return report